@@ -0,0 +1,15 @@
+"""Shared settings for reading the CDE unduplicated-pupil workbook."""
+
+from __future__ import annotations
+
+try:
+    import python_calamine  # noqa: F401  (backend for pandas engine="calamine")
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+# Rust-based calamine reads the workbook several times faster than openpyxl.
+EXCEL_ENGINE = "calamine" if HAS_CALAMINE else "openpyxl"
+
+# CDE numbers counties alphabetically (01-58); San Francisco is 38, not FIPS 075.
+SF_COUNTY_CODE = 38
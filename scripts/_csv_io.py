@@ -0,0 +1,80 @@
+"""Shared CSV helpers for the scripts.
+
+Parsed frames are memoized per (path, mtime), so a file read more than once in
+a process is only parsed once, and an edited file is always reparsed. Outputs
+use csv.writer-style CRLF rows, so regenerated files diff cleanly, and a .gz
+suffix writes gzip (level 1).
+"""
+
+from __future__ import annotations
+
+import functools
+import gzip
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+
+@functools.lru_cache(maxsize=32)
+def _load(path_str: str, mtime_ns: int) -> pd.DataFrame:
+    # round_trip parses floats exactly like float(), keeping coordinates bit-identical.
+    return pd.read_csv(path_str, encoding="utf-8-sig", float_precision="round_trip")
+
+
+def open_output(path: Path):
+    """Text handle for writing `path`; a .gz suffix writes gzip (level 1)."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=1)
+    return path.open("w", newline="", encoding="utf-8")
+
+
+def write_frame(df: pd.DataFrame, path: Path) -> None:
+    """Write `df` to `path` without the index, creating parent directories."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(path, index=False, lineterminator="\r\n", compression={"method": "infer", "compresslevel": 1})
+
+
+def load(path: Path) -> pd.DataFrame:
+    """Return a private copy of the parsed CSV at `path`."""
+    path = Path(path)
+    return _load(str(path), path.stat().st_mtime_ns).copy()
+
+
+def load_site_locations(path: Path) -> dict[str, dict]:
+    """Load site locations: site_id -> {lat, lon, name}, skipping ungeocoded sites."""
+    df = load(path)
+    lat = pd.to_numeric(df["lat" if "lat" in df.columns else "latitude"], errors="coerce")
+    lon = pd.to_numeric(df["lon" if "lon" in df.columns else "longitude"], errors="coerce")
+    keep = lat.notna() & lon.notna() & (lat != 0) & (lon != 0)
+    return {
+        site_id: {"lat": la, "lon": lo, "name": name}
+        for site_id, la, lo, name in zip(
+            df.loc[keep, "site_id"].str.strip(),
+            lat[keep].tolist(),
+            lon[keep].tolist(),
+            df.loc[keep, "site_name"].str.strip(),
+        )
+    }
+
+
+def sum_by_site(path: Path, col: str) -> dict[str, float]:
+    """Sum a numeric column per site: site_id -> total (across days/scenarios)."""
+    df = load(path)
+    return df.groupby(df["site_id"].str.strip(), sort=False)[col].sum().to_dict()
+
+
+def load_map_inputs(processed_dir: Path) -> tuple[dict[str, dict], dict[str, float], dict[str, float], dict[str, float]]:
+    """Site locations plus per-site supply, ACS-optimal and CDE-optimal meal totals for the map scripts.
+
+    The four files are independent, so they are parsed on threads (pandas
+    releases the GIL while parsing).
+    """
+    processed_dir = Path(processed_dir)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        sites = pool.submit(load_site_locations, processed_dir / "site_locations.csv")
+        supply = pool.submit(sum_by_site, processed_dir / "site_day_supply.csv", "meals_available")
+        acs = pool.submit(sum_by_site, processed_dir / "site_day_allocation_comparison.csv", "optimal_meals")
+        cde = pool.submit(sum_by_site, processed_dir / "site_day_allocation_comparison_cde.csv", "optimal_meals")
+        return sites.result(), supply.result(), acs.result(), cde.result()
@@ -16,22 +16,46 @@ from __future__ import annotations
 
 import argparse
 import csv
-import math
+import io
+import re
 import sys
 import urllib.request
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import chain
 from pathlib import Path
 from difflib import get_close_matches
 
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
 
-def haversine_miles(lat1, lon1, lat2, lon2):
-    # returns distance in miles
-    R = 3958.8
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+from _csv_io import open_output, write_frame
+
+try:
+    from rapidfuzz import fuzz, process
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+
+
+EARTH_RADIUS_MILES = 3958.8
+
+# school-name columns in lookup priority; NAME_COL_RE catches other spellings
+NAME_COLUMNS = ["School Name", "school_name", "SCH_NAME", "School", "Name", "LEA_NAME", "SCHOOL", "school"]
+NAME_COL_RE = re.compile(r"school.*name|^name$|sch_name", re.I)
+
+
+def unit_xyz(lat, lon) -> np.ndarray:
+    """Map lat/lon degrees onto the unit sphere as an (n, 3) array."""
+    lat_r = np.radians(np.asarray(lat, dtype=float))
+    lon_r = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat_r)
+    return np.column_stack([cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)])
+
+
+def chord_to_miles(chord: np.ndarray) -> np.ndarray:
+    # unit-sphere chord length -> great-circle distance in miles
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
 
 
 def download_if_url(path: str) -> Path:
@@ -48,16 +72,18 @@ def download_if_url(path: str) -> Path:
         raise RuntimeError(f"Couldn't read or download {path}: {e}")
 
 
-def read_csv_path(path: Path) -> list[dict[str, str]]:
-    with path.open(newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+def read_csv_path(path: Path) -> Iterator[dict[str, str]]:
+    """Stream CSV rows as dicts without materializing the file."""
+    with open(path, "rb", buffering=1 << 20) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
 
 
-def write_csv(path: Path, rows: list[dict[str, str]], fieldnames: list[str]) -> None:
+def write_csv(path: Path, rows: Iterable[Sequence[object]], fieldnames: list[str]) -> None:
+    """Write tuple rows already ordered like `fieldnames`."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    with open_output(path) as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
         writer.writerows(rows)
 
 
@@ -69,15 +95,40 @@ def load_site_locations(path: Path) -> dict[str, dict]:
     return out
 
 
-def find_nearest_tract(lat, lon, tract_centroids):
-    best = None
-    best_d = float("inf")
-    for t in tract_centroids:
-        d = haversine_miles(lat, lon, float(t["centroid_lat"]), float(t["centroid_lon"]))
-        if d < best_d:
-            best_d = d
-            best = t
-    return best, best_d
+def closest_site_name(name: str, site_names: list[str]) -> str | None:
+    if HAS_RAPIDFUZZ:
+        # Indel ratio (fuzz.ratio) is never below SequenceMatcher.ratio, so this keeps every
+        # name difflib could pick; get_close_matches then chooses among the survivors.
+        hits = process.extract(name, site_names, scorer=fuzz.ratio, processor=None, score_cutoff=60, limit=None)
+        site_names = [hit[0] for hit in hits]
+    matches = get_close_matches(name, site_names, n=1, cutoff=0.6)
+    return matches[0] if matches else None
+
+
+def load_tract_centroids(path: Path) -> pd.DataFrame:
+    return pd.read_csv(
+        path,
+        dtype={
+            "tract_geoid": str,
+            "state_fips": str,
+            "county_fips": str,
+            "tract_fips": str,
+            "tract_name": str,
+            "centroid_lat": np.float64,
+            "centroid_lon": np.float64,
+        },
+        keep_default_na=False,
+    )
+
+
+def build_tract_tree(tract_centroids: pd.DataFrame) -> cKDTree:
+    return cKDTree(unit_xyz(tract_centroids["centroid_lat"], tract_centroids["centroid_lon"]))
+
+
+def find_nearest_tracts(lats, lons, tree: cKDTree):
+    """Return (tract positions, distances in miles) for each point."""
+    chord, idx = tree.query(unit_xyz(lats, lons), k=1, workers=-1)
+    return idx, chord_to_miles(chord)
 
 
 def main():
@@ -86,26 +137,27 @@ def main():
     parser.add_argument("--count-col", default="unduplicated", help="Column name with unduplicated student counts (case-insensitive substring match)")
     parser.add_argument("--site-locations", default="data/processed/site_locations.csv")
     parser.add_argument("--tract-centroids", default="data/processed/tract_centroids.csv")
-    parser.add_argument("--output-tract-child", default="data/processed/tract_child_population_cde.csv")
-    parser.add_argument("--comparison-out", default="data/processed/demand_comparison_summary.csv")
+    parser.add_argument("--output-tract-child", default="data/processed/tract_child_population_cde.csv", help="Output CSV (a .gz suffix writes gzip)")
+    parser.add_argument("--comparison-out", default="data/processed/demand_comparison_summary.csv", help="Output CSV (a .gz suffix writes gzip)")
     args = parser.parse_args()
 
     cde_path = Path(download_if_url(args.cde_csv))
     cde_rows = read_csv_path(cde_path)
-    if not cde_rows:
+    first_row = next(cde_rows, None)
+    if first_row is None:
         print("No rows in CDE file", file=sys.stderr)
         sys.exit(1)
 
     # load tract centroids
-    tracts = read_csv_path(Path(args.tract_centroids))
-    tract_map = {t["tract_geoid"]: t for t in tracts}
+    tracts = load_tract_centroids(Path(args.tract_centroids))
+    tract_tree = build_tract_tree(tracts)
 
     # load site locations for fallback geocoding
     sites = load_site_locations(Path(args.site_locations))
     site_names = list(sites.keys())
 
     # detect count column heuristically
-    header = list(cde_rows[0].keys())
+    header = list(first_row.keys())
     count_col = None
     lower = [h.lower() for h in header]
     target = args.count_col.lower()
@@ -127,9 +179,14 @@ def main():
         if "lon" in lh or "long" in lh or "longitude" in lh:
             lon_col = h
 
-    tract_counts: dict[str, float] = {t["tract_geoid"]: 0.0 for t in tracts}
+    # resolve school-name columns once; rows use the first non-empty one
+    name_cols = [c for c in NAME_COLUMNS if c in header] or [h for h in header if NAME_COL_RE.search(h)]
+
+    located_lats: list[float] = []
+    located_lons: list[float] = []
+    located_counts: list[float] = []
 
-    for r in cde_rows:
+    for r in chain([first_row], cde_rows):
         try:
             count = float(r.get(count_col, "0") or 0)
         except Exception:
@@ -144,17 +201,11 @@ def main():
                 lat = lon = None
         # fallback: try to match school name to site locations
         if lat is None or lon is None:
-            name = r.get("School Name") or r.get("school_name") or r.get("SCH_NAME") or r.get("School")
-            if not name:
-                # try any plausible field
-                for cand in ["Name", "LEA_NAME", "SCHOOL", "school"]:
-                    if cand in r and r[cand]:
-                        name = r[cand]
-                        break
+            name = next((r[c] for c in name_cols if r[c]), None)
             if name:
-                matches = get_close_matches(name, site_names, n=1, cutoff=0.6)
-                if matches:
-                    s = sites[matches[0]]
+                match = closest_site_name(name, site_names)
+                if match:
+                    s = sites[match]
                     try:
                         lat = float(s.get("lat"))
                         lon = float(s.get("lon"))
@@ -165,64 +216,48 @@ def main():
             # couldn't locate this school; skip (counts may be lost)
             continue
 
-        nearest, d = find_nearest_tract(lat, lon, tracts)
-        if nearest is None:
-            continue
-        tract_counts[nearest["tract_geoid"]] += count
+        located_lats.append(lat)
+        located_lons.append(lon)
+        located_counts.append(count)
+
+    tract_counts = np.zeros(len(tracts))
+    if located_counts:
+        nearest, _ = find_nearest_tracts(located_lats, located_lons, tract_tree)
+        tract_counts = np.bincount(nearest, weights=located_counts, minlength=len(tracts))
 
     # produce tract-level CSV with same header as existing ACS file
     # header: acs_year,state_fips,county_fips,tract_fips,tract_geoid,tract_name,male_under18,female_under18,child_pop_u18
-    out_rows = []
-    for t in tracts:
-        geoid = t["tract_geoid"]
-        state_fips = t.get("state_fips", "06")
-        county_fips = t.get("county_fips", "075")
-        tract_fips = t.get("tract_fips", "")
-        tract_name = t.get("tract_name", "")
-        total = tract_counts.get(geoid, 0.0)
-        out_rows.append(
-            {
-                "acs_year": "2024",
-                "state_fips": state_fips,
-                "county_fips": county_fips,
-                "tract_fips": tract_fips,
-                "tract_geoid": geoid,
-                "tract_name": tract_name,
-                "male_under18": "",
-                "female_under18": "",
-                "child_pop_u18": int(round(total)),
-            }
-        )
-
-    write_csv(Path(args.output_tract_child), out_rows, [
-        "acs_year",
-        "state_fips",
-        "county_fips",
-        "tract_fips",
-        "tract_geoid",
-        "tract_name",
-        "male_under18",
-        "female_under18",
-        "child_pop_u18",
-    ])
+    child_pop_u18 = np.rint(tract_counts).astype(np.int64)
+    out = pd.DataFrame({
+        "acs_year": "2024",
+        "state_fips": tracts.get("state_fips", "06"),
+        "county_fips": tracts.get("county_fips", "075"),
+        "tract_fips": tracts.get("tract_fips", ""),
+        "tract_geoid": tracts["tract_geoid"],
+        "tract_name": tracts.get("tract_name", ""),
+        "male_under18": "",
+        "female_under18": "",
+        "child_pop_u18": child_pop_u18,
+    })
+    write_frame(out, Path(args.output_tract_child))
 
     # produce simple comparison summary for participation rates
     # read original ACS totals
-    orig = read_csv_path(Path("data/processed/tract_child_population.csv"))
-    orig_total = sum(int(r.get("child_pop_u18") or 0) for r in orig)
-    cde_total = sum(int(r.get("child_pop_u18") or 0) for r in out_rows)
+    orig = pd.read_csv(Path("data/processed/tract_child_population.csv"), usecols=["child_pop_u18"])
+    orig_total = int(orig["child_pop_u18"].fillna(0).sum())
+    cde_total = int(child_pop_u18.sum())
 
     rates = [0.2, 0.3, 0.4]
     comp_rows = []
     for rate in rates:
         comp_rows.append(
-            {
-                "participation_rate": rate,
-                "total_demand_census": int(round(orig_total * rate)),
-                "total_demand_cde": int(round(cde_total * rate)),
-                "abs_diff": int(round((cde_total - orig_total) * rate)),
-                "pct_diff": "{:.1f}".format(100.0 * (cde_total - orig_total) / max(1, orig_total)),
-            }
+            (
+                rate,
+                int(round(orig_total * rate)),
+                int(round(cde_total * rate)),
+                int(round((cde_total - orig_total) * rate)),
+                "{:.1f}".format(100.0 * (cde_total - orig_total) / max(1, orig_total)),
+            )
         )
 
     write_csv(Path(args.comparison_out), comp_rows, [
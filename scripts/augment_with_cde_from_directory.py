@@ -5,44 +5,60 @@ then augment tract-level demand with CDE FRPM counts.
 """
 
 import csv
+import io
+import math
 import sys
+from collections import defaultdict
 from pathlib import Path
 from typing import Optional
 from difflib import SequenceMatcher
 
 import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
 
+from _csv_io import write_frame
 
-def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Distance between two points in miles."""
-    R = 3959  # Earth's radius in miles
-    lat1_rad, lon1_rad = np.radians(lat1), np.radians(lon1)
-    lat2_rad, lon2_rad = np.radians(lat2), np.radians(lon2)
-    dlat = lat2_rad - lat1_rad
-    dlon = lon2_rad - lon1_rad
-    a = np.sin(dlat / 2) ** 2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2) ** 2
-    return 2 * R * np.arcsin(np.sqrt(a))
+try:
+    from rapidfuzz import fuzz, process
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+
+EARTH_RADIUS_MILES = 3959
+MAX_TRACT_DISTANCE_MILES = 50
+
+
+def sphere_xyz(lat_rad: np.ndarray, lon_rad: np.ndarray, cos_lat: np.ndarray) -> np.ndarray:
+    """Unit-sphere (n, 3) coordinates from precomputed radians and cos(lat)."""
+    return np.column_stack([cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)])
+
+
+def unit_xyz(lat, lon) -> np.ndarray:
+    """Map lat/lon degrees onto the unit sphere as an (n, 3) array."""
+    lat_rad = np.radians(np.asarray(lat, dtype=float))
+    lon_rad = np.radians(np.asarray(lon, dtype=float))
+    return sphere_xyz(lat_rad, lon_rad, np.cos(lat_rad))
+
+
+def chord_to_miles(chord: np.ndarray) -> np.ndarray:
+    """Convert unit-sphere chord length to great-circle distance in miles."""
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
 
 
 def read_csv(path: Path):
     """Read CSV and yield rows as dicts."""
-    with open(path, encoding="utf-8-sig") as f:
+    with open(path, "rb", buffering=1 << 20) as raw, io.TextIOWrapper(raw, encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
         for row in reader:
             yield row
 
 
-def write_csv(rows, path: Path, fieldnames=None):
-    """Write rows to CSV."""
-    if not rows:
+def write_csv(df: pd.DataFrame, path: Path):
+    """Write a DataFrame to CSV (CRLF rows, like csv.writer)."""
+    if df.empty:
         return
-    if fieldnames is None:
-        fieldnames = list(rows[0].keys())
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    write_frame(df, path)
 
 
 def parse_cde_directory(directory_path: Path) -> dict[str, tuple[float, float]]:
@@ -51,13 +67,20 @@ def parse_cde_directory(directory_path: Path) -> dict[str, tuple[float, float]]:
     Returns dict mapping school name (lowercase) to (latitude, longitude).
     """
     school_coords = {}
-    with open(directory_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter="\t")
+    with open(directory_path, "rb", buffering=1 << 20) as raw, io.TextIOWrapper(raw, encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter="\t")
+        header = next(reader, [])
+        if not {"School", "Latitude", "Longitude"} <= set(header):
+            return school_coords
+        school_i, lat_i, lon_i = header.index("School"), header.index("Latitude"), header.index("Longitude")
+        width = max(school_i, lat_i, lon_i) + 1
         for row in reader:
-            school_name = row.get("School", "").strip()
+            if len(row) < width:
+                continue
+            school_name = row[school_i].strip()
             try:
-                lat = float(row.get("Latitude", ""))
-                lon = float(row.get("Longitude", ""))
+                lat = float(row[lat_i])
+                lon = float(row[lon_i])
                 if school_name and lat and lon:
                     # Normalize school name for matching
                     key = school_name.lower().strip()
@@ -67,49 +90,121 @@ def parse_cde_directory(directory_path: Path) -> dict[str, tuple[float, float]]:
     return school_coords
 
 
-def fuzzy_match_name(name: str, candidates: dict[str, tuple[float, float]], threshold: float = 0.6) -> Optional[tuple[float, float]]:
+LENGTH_BUCKET_SIZE = 4
+
+
+def name_trigrams(name: str) -> set[str]:
+    """Character trigrams of a normalized name (the whole name if shorter than 3)."""
+    if len(name) < 3:
+        return {name} if name else set()
+    return {name[k : k + 3] for k in range(len(name) - 2)}
+
+
+def build_name_index(names: list[str]) -> tuple[dict[str, set[int]], dict[int, set[int]]]:
     """
-    Fuzzy match a school name to candidates and return (lat, lon) if found.
+    Block candidate names by shared trigram and by length bucket.
+    Returns (trigram -> candidate positions, len(name) // 4 -> candidate positions).
     """
-    name_lower = name.lower().strip()
-    best_match = None
+    trigram_index: dict[str, set[int]] = defaultdict(set)
+    length_buckets: dict[int, set[int]] = defaultdict(set)
+    for pos, name in enumerate(names):
+        for gram in name_trigrams(name):
+            trigram_index[gram].add(pos)
+        length_buckets[len(name) // LENGTH_BUCKET_SIZE].add(pos)
+    return trigram_index, length_buckets
+
+
+def blocked_candidates(
+    name: str, trigram_index: dict[str, set[int]], length_buckets: dict[int, set[int]], threshold: float = 0.6
+) -> set[int]:
+    """Candidates sharing at least one trigram with `name` and within the length band."""
+    shared: set[int] = set()
+    for gram in name_trigrams(name):
+        shared |= trigram_index.get(gram, set())
+    # ratio = 2*M/(len_a + len_b) with M <= min length, so ratio >= t needs
+    # min_len/max_len >= t/(2-t); lengths outside that band can never reach the cutoff.
+    # Bounds are rounded outward so float error never drops a borderline length.
+    lo = int(len(name) * threshold / (2 - threshold)) // LENGTH_BUCKET_SIZE
+    hi = math.ceil(len(name) * (2 - threshold) / threshold) // LENGTH_BUCKET_SIZE
+    in_band: set[int] = set()
+    for bucket in range(lo, hi + 1):
+        in_band |= length_buckets.get(bucket, set())
+    return shared & in_band
+
+
+def best_candidate_position(query: str, pool: list[str], threshold: float = 0.6) -> Optional[int]:
+    """
+    Position of the best-scoring entry in `pool` at or above `threshold`, else None.
+    """
+    positions = range(len(pool))
+    if HAS_RAPIDFUZZ:
+        # Indel ratio (fuzz.ratio) is never below SequenceMatcher.ratio, so this keeps every
+        # entry that can reach `threshold`; difflib then scores only those survivors.
+        hits = process.extract(query, pool, scorer=fuzz.ratio, processor=None, score_cutoff=threshold * 100, limit=None)
+        positions = sorted(hit[2] for hit in hits)
+    best_pos = None
     best_score = 0
-    for cand_name in candidates:
-        score = SequenceMatcher(None, name_lower, cand_name).ratio()
+    for pos in positions:
+        score = SequenceMatcher(None, query, pool[pos]).ratio()
         if score > best_score:
             best_score = score
-            best_match = cand_name
-    if best_score >= threshold and best_match:
-        return candidates[best_match]
+            best_pos = pos
+    if best_score >= threshold and best_pos is not None and pool[best_pos]:
+        return best_pos
     return None
 
 
-def load_tract_centroids(path: Path) -> dict[str, tuple[float, float]]:
-    """Load tract centroids: tract_geoid -> (lat, lon)."""
-    centroids = {}
-    for row in read_csv(path):
-        tract_geoid = row["tract_geoid"].strip()
-        try:
-            lat = float(row["centroid_lat"])
-            lon = float(row["centroid_lon"])
-            centroids[tract_geoid] = (lat, lon)
-        except (ValueError, KeyError):
-            pass
-    return centroids
+def match_school_names(
+    names: list[str], candidates: dict[str, tuple[float, float]], threshold: float = 0.6
+) -> list[Optional[tuple[float, float]]]:
+    """
+    Fuzzy match every name against the candidates and return (lat, lon) or None per name.
+    Each name is only scored against candidates that share a trigram and fall in its
+    length band; names with no blocked candidates fall back to a full scan.
+    """
+    choices = list(candidates.keys())
+    trigram_index, length_buckets = build_name_index(choices)
+    matches: list[Optional[tuple[float, float]]] = []
+    queries = [name.lower().strip() for name in names]
+    for query in queries:
+        rows = blocked_candidates(query, trigram_index, length_buckets, threshold=threshold)
+        positions = sorted(rows) if rows else range(len(choices))
+        pos = best_candidate_position(
+            query,
+            [choices[k] for k in positions],
+            threshold=threshold,
+        )
+        matches.append(candidates[choices[positions[pos]]] if pos is not None else None)
+    return matches
 
 
-def find_nearest_tract(lat: float, lon: float, centroids: dict[str, tuple[float, float]]) -> Optional[str]:
-    """Find nearest tract centroid by Haversine distance."""
-    if not centroids:
-        return None
-    best_tract = None
-    best_dist = float("inf")
-    for tract_geoid, (c_lat, c_lon) in centroids.items():
-        dist = haversine_miles(lat, lon, c_lat, c_lon)
-        if dist < best_dist:
-            best_dist = dist
-            best_tract = tract_geoid
-    return best_tract if best_dist < 50 else None  # 50-mile cap
+def load_tract_centroids(path: Path) -> tuple[list[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Load tract centroids once with their trig precomputed.
+    Returns (tract_geoids, lat_rad, lon_rad, cos_lat).
+    """
+    df = pd.read_csv(
+        path,
+        usecols=["tract_geoid", "centroid_lat", "centroid_lon"],
+        dtype={"tract_geoid": str},
+        encoding="utf-8-sig",
+    )
+    df["tract_geoid"] = df["tract_geoid"].str.strip()
+    df["centroid_lat"] = pd.to_numeric(df["centroid_lat"], errors="coerce")
+    df["centroid_lon"] = pd.to_numeric(df["centroid_lon"], errors="coerce")
+    df = df.dropna(subset=["centroid_lat", "centroid_lon"]).drop_duplicates("tract_geoid", keep="last")
+    lat_rad = np.radians(df["centroid_lat"].to_numpy(dtype=np.float64))
+    lon_rad = np.radians(df["centroid_lon"].to_numpy(dtype=np.float64))
+    return df["tract_geoid"].tolist(), lat_rad, lon_rad, np.cos(lat_rad)
+
+
+def find_nearest_tracts(lats: np.ndarray, lons: np.ndarray, tree: cKDTree) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the nearest tract centroid for each point.
+    Returns (tract positions, mask of points within the 50-mile cap).
+    """
+    chord, idx = tree.query(unit_xyz(lats, lons), k=1, workers=-1)
+    return idx, chord_to_miles(chord) < MAX_TRACT_DISTANCE_MILES
 
 
 def augment_with_cde_from_directory(
@@ -128,14 +223,13 @@ def augment_with_cde_from_directory(
     print(f"Loaded {len(school_coords)} schools from directory.")
 
     print(f"Loading tract centroids from {tract_centroids_path}...")
-    centroids = load_tract_centroids(tract_centroids_path)
-    print(f"Loaded {len(centroids)} tract centroids.")
+    tract_geoids, lat_rad, lon_rad, cos_lat = load_tract_centroids(tract_centroids_path)
+    print(f"Loaded {len(tract_geoids)} tract centroids.")
+    tree = cKDTree(sphere_xyz(lat_rad, lon_rad, cos_lat)) if tract_geoids else None
 
     print(f"Reading manual CDE CSV from {manual_csv}...")
-    tract_counts = {}
-    matched_count = 0
-    unmatched_count = 0
-
+    school_names: list[str] = []
+    school_counts: list[float] = []
     for row in read_csv(manual_csv):
         school_name = row.get("School Name", "").strip()
         try:
@@ -145,46 +239,44 @@ def augment_with_cde_from_directory(
 
         if not school_name or count <= 0:
             continue
+        school_names.append(school_name)
+        school_counts.append(count)
 
-        # Fuzzy match school name to CDE directory
-        coords = fuzzy_match_name(school_name, school_coords, threshold=0.6)
-        if coords:
-            lat, lon = coords
-            nearest_tract = find_nearest_tract(lat, lon, centroids)
-            if nearest_tract:
-                tract_counts[nearest_tract] = tract_counts.get(nearest_tract, 0) + count
-                matched_count += 1
-            else:
-                unmatched_count += 1
-        else:
-            unmatched_count += 1
+    # Fuzzy match school names to CDE directory, then gather coordinates columnar
+    matches = match_school_names(school_names, school_coords, threshold=0.6)
+    found = np.array([coords is not None for coords in matches], dtype=bool)
+    located = np.array([coords for coords in matches if coords is not None], dtype=np.float64).reshape(-1, 2)
+    s_lat, s_lon = located[:, 0], located[:, 1]
+    counts = np.asarray(school_counts, dtype=np.float64)[found]
+
+    tract_counts = np.zeros(len(tract_geoids))
+    matched_count = 0
+    if counts.size and tree is not None:
+        nearest, within_cap = find_nearest_tracts(s_lat, s_lon, tree)
+        tract_counts = np.bincount(nearest[within_cap], weights=counts[within_cap], minlength=len(tract_geoids))
+        matched_count = int(within_cap.sum())
+    unmatched_count = len(school_names) - matched_count
 
     print(f"Matched {matched_count} schools; {unmatched_count} unmatched.")
-    print(f"Assigned counts to {len(tract_counts)} tracts.")
+    print(f"Assigned counts to {int(np.count_nonzero(tract_counts))} tracts.")
 
     # Build output rows: replicate all tracts but fill in CDE counts where assigned
     print(f"Building tract-level CDE output...")
-    output_rows = []
-    for tract_geoid in sorted(centroids.keys()):
-        cde_count = int(tract_counts.get(tract_geoid, 0))
-        output_rows.append(
-            {
-                "acs_year": 2024,
-                "state_fips": "06",
-                "county_fips": "075",
-                "tract_fips": tract_geoid[-6:],  # last 6 digits
-                "tract_geoid": tract_geoid,
-                "tract_name": f"Census Tract {tract_geoid[-6:].lstrip('0') or '0'}",
-                "male_under18": "",
-                "female_under18": "",
-                "child_pop_u18": cde_count,
-            }
-        )
-
-    write_csv(output_rows, output_path, fieldnames=[
-        "acs_year", "state_fips", "county_fips", "tract_fips", "tract_geoid",
-        "tract_name", "male_under18", "female_under18", "child_pop_u18"
-    ])
+    order = np.argsort(np.asarray(tract_geoids, dtype=str), kind="stable")
+    geoids = pd.Series(tract_geoids, dtype=str).iloc[order].reset_index(drop=True)
+    tract_fips = geoids.str[-6:]  # last 6 digits
+    out = pd.DataFrame({
+        "acs_year": 2024,
+        "state_fips": "06",
+        "county_fips": "075",
+        "tract_fips": tract_fips,
+        "tract_geoid": geoids,
+        "tract_name": "Census Tract " + tract_fips.str.lstrip("0").replace("", "0"),
+        "male_under18": "",
+        "female_under18": "",
+        "child_pop_u18": tract_counts[order].astype(np.int64),
+    })
+    write_csv(out, output_path)
     print(f"Wrote tract-level CDE child counts to {output_path}")
 
 
@@ -4,59 +4,46 @@
 from __future__ import annotations
 
 import argparse
-import csv
-from collections import defaultdict
 from pathlib import Path
 
+import pandas as pd
+
+from _csv_io import write_frame
+
+
+KEY_COLUMNS = ["site_id", "distribution_date", "meal_type"]
+FIELDNAMES = [
+    "site_id",
+    "site_name",
+    "address",
+    "distribution_date",
+    "day",
+    "meal_type",
+    "meals_available",
+]
+
 
 def build_supply(input_csv: Path, output_csv: Path) -> None:
-    with input_csv.open(newline="", encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
-
-    grouped: dict[tuple[str, str, str], dict[str, str | int]] = {}
-    total_by_key = defaultdict(int)
-
-    for row in rows:
-        key = (row["site_id"], row["distribution_date"], row["meal_type"])
-        total_by_key[key] += int(row["meals_available"])
-
-        if key not in grouped:
-            grouped[key] = {
-                "site_id": row["site_id"],
-                "site_name": row["site_name"],
-                "address": row["address"],
-                "distribution_date": row["distribution_date"],
-                "day": row["day"],
-                "meal_type": row["meal_type"],
-                "meals_available": 0,
-            }
-
-    for key, total in total_by_key.items():
-        grouped[key]["meals_available"] = total
-
-    out_rows = sorted(
-        grouped.values(),
-        key=lambda r: (
-            str(r["site_id"]),
-            str(r["distribution_date"]),
-            str(r["meal_type"]),
-        ),
+    rows = pd.read_csv(
+        input_csv,
+        usecols=FIELDNAMES,
+        dtype={col: str for col in FIELDNAMES if col != "meals_available"} | {"meals_available": "int64"},
+        keep_default_na=False,
+    )
+
+    # One hash-aggregation pass: sum meals, take site metadata from the first raw row.
+    out_rows = (
+        rows.groupby(KEY_COLUMNS, sort=False, as_index=False)
+        .agg(
+            meals_available=("meals_available", "sum"),
+            site_name=("site_name", "first"),
+            address=("address", "first"),
+            day=("day", "first"),
+        )[FIELDNAMES]
+        .sort_values(KEY_COLUMNS, kind="stable")
     )
 
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "site_id",
-        "site_name",
-        "address",
-        "distribution_date",
-        "day",
-        "meal_type",
-        "meals_available",
-    ]
-    with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(out_rows)
+    write_frame(out_rows, output_csv)
 
     print(f"Wrote {len(out_rows)} rows to {output_csv}")
 
@@ -73,7 +60,7 @@ def main() -> None:
         "--output-csv",
         type=Path,
         default=Path("data/processed/site_day_supply.csv"),
-        help="Output processed CSV path",
+        help="Output processed CSV path (a .gz suffix writes gzip)",
     )
     args = parser.parse_args()
 
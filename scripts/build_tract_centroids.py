@@ -1,55 +1,98 @@
 #!/usr/bin/env python3
-"""Build SF tract centroid coordinates from Census TIGER polygons."""
+"""Build SF tract centroid coordinates from Census TIGER polygons.
+
+The state TIGER tract ZIP is cached under `$SFL_CACHE/tiger` (default
+`~/.cache/sf_lunches/tiger`) and only downloaded when missing.
+"""
 
 from __future__ import annotations
 
 import argparse
-import csv
+import email.utils
+import os
+import shutil
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 import geopandas as gpd
+import pandas as pd
+
+from _csv_io import write_frame
 
 
 STATE_FIPS = "06"
 COUNTY_FIPS = "075"
 CENTROID_CRS = "EPSG:3310"  # California Albers
 WGS84 = "EPSG:4326"
+# lon/lat bounding box for SF County, wide enough to include the Farallon Islands tract.
+SF_BBOX = (-123.20, 37.60, -122.28, 37.95)
 
 
 def detect_tiger_year(population_csv: Path) -> int:
-    with population_csv.open(newline="", encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
-    if not rows:
+    years = pd.read_csv(population_csv, usecols=["acs_year"], dtype={"acs_year": "int64"})["acs_year"]
+    if years.empty:
         raise ValueError(f"No rows in {population_csv}")
-    years = sorted({int(row["acs_year"]) for row in rows})
-    return years[-1]
+    return int(years.max())
 
 
 def tiger_url(year: int) -> str:
     return f"zip+https://www2.census.gov/geo/tiger/TIGER{year}/TRACT/tl_{year}_{STATE_FIPS}_tract.zip"
 
 
+def tiger_cache_path(year: int) -> Path:
+    cache_dir = Path(os.environ.get("SFL_CACHE", "~/.cache/sf_lunches")).expanduser()
+    return cache_dir / "tiger" / f"tl_{year}_{STATE_FIPS}_tract.zip"
+
+
+def fetch_tiger_zip(year: int, refresh: bool = False) -> Path:
+    """Return the cached TIGER ZIP, downloading it if missing (or stale when `refresh`)."""
+    path = tiger_cache_path(year)
+    if path.exists() and not refresh:
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    request = urllib.request.Request(tiger_url(year).removeprefix("zip+"))
+    if path.exists():
+        request.add_header("If-Modified-Since", email.utils.formatdate(path.stat().st_mtime, usegmt=True))
+    partial = path.with_suffix(".zip.part")
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response, partial.open("wb") as f:
+            shutil.copyfileobj(response, f)
+        partial.replace(path)
+    except urllib.error.HTTPError as e:
+        if e.code != 304:  # 304 Not Modified: keep the cached copy
+            raise
+    finally:
+        partial.unlink(missing_ok=True)
+    return path
+
+
 def read_target_geoids(population_csv: Path) -> set[str]:
-    with population_csv.open(newline="", encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
-    return {row["tract_geoid"] for row in rows}
-
-
-def write_csv(rows: list[dict[str, str | float]], output_csv: Path) -> None:
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "tract_geoid",
-        "state_fips",
-        "county_fips",
-        "tract_fips",
-        "tract_name",
-        "centroid_lat",
-        "centroid_lon",
-    ]
-    with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    geoids = pd.read_csv(population_csv, usecols=["tract_geoid"], dtype={"tract_geoid": str})["tract_geoid"]
+    return set(geoids)
+
+
+FIELDNAMES = [
+    "tract_geoid",
+    "state_fips",
+    "county_fips",
+    "tract_fips",
+    "tract_name",
+    "centroid_lat",
+    "centroid_lon",
+]
+TIGER_COLUMNS = {
+    "GEOID": "tract_geoid",
+    "STATEFP": "state_fips",
+    "COUNTYFP": "county_fips",
+    "TRACTCE": "tract_fips",
+    "NAMELSAD": "tract_name",
+}
+
+
+def write_csv(centroids: pd.DataFrame, output_csv: Path) -> None:
+    write_frame(centroids[FIELDNAMES], output_csv)
 
 
 def main() -> None:
@@ -66,18 +109,24 @@ def main() -> None:
         default=None,
         help="TIGER vintage year. Defaults to acs_year from population CSV.",
     )
+    parser.add_argument(
+        "--refresh-tiger",
+        action="store_true",
+        help="Revalidate the cached TIGER ZIP with census.gov (If-Modified-Since).",
+    )
     parser.add_argument(
         "--output-csv",
         type=Path,
         default=Path("data/processed/tract_centroids.csv"),
-        help="Output centroid CSV.",
+        help="Output centroid CSV (a .gz suffix writes gzip).",
     )
     args = parser.parse_args()
 
     year = args.tiger_year or detect_tiger_year(args.population_csv)
     targets = read_target_geoids(args.population_csv)
 
-    gdf = gpd.read_file(tiger_url(year))
+    tiger_zip = fetch_tiger_zip(year, refresh=args.refresh_tiger)
+    gdf = gpd.read_file(f"zip://{tiger_zip.resolve()}", bbox=SF_BBOX)
     sf = gdf[(gdf["STATEFP"] == STATE_FIPS) & (gdf["COUNTYFP"] == COUNTY_FIPS)].copy()
     sf = sf[sf["GEOID"].isin(targets)].copy()
     if sf.empty:
@@ -87,24 +136,17 @@ def main() -> None:
     centroids = projected.geometry.centroid
     centroid_points = gpd.GeoSeries(centroids, crs=CENTROID_CRS).to_crs(WGS84)
 
-    rows: list[dict[str, str | float]] = []
-    for (_, rec), point in zip(sf.iterrows(), centroid_points):
-        rows.append(
-            {
-                "tract_geoid": rec["GEOID"],
-                "state_fips": rec["STATEFP"],
-                "county_fips": rec["COUNTYFP"],
-                "tract_fips": rec["TRACTCE"],
-                "tract_name": rec["NAMELSAD"],
-                "centroid_lat": round(float(point.y), 8),
-                "centroid_lon": round(float(point.x), 8),
-            }
+    out = (
+        sf.assign(
+            centroid_lat=centroid_points.y.round(8).to_numpy(),
+            centroid_lon=centroid_points.x.round(8).to_numpy(),
         )
-
-    rows.sort(key=lambda r: str(r["tract_geoid"]))
-    write_csv(rows, args.output_csv)
+        .rename(columns=TIGER_COLUMNS)
+        .sort_values("tract_geoid", kind="stable")
+    )
+    write_csv(out, args.output_csv)
     print(
-        f"Wrote {len(rows)} tract centroids to {args.output_csv} "
+        f"Wrote {len(out)} tract centroids to {args.output_csv} "
         f"using TIGER {year}."
     )
 
@@ -4,10 +4,14 @@
 from __future__ import annotations
 
 import argparse
-import csv
-import math
+from collections.abc import Callable
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+from _csv_io import write_frame
+
 
 def parse_csv_list(raw: str) -> list[str]:
     return [item.strip() for item in raw.split(",") if item.strip()]
@@ -23,76 +27,67 @@ def parse_float_list(raw: str) -> list[float]:
     return values
 
 
-def apply_rounding(value: float, mode: str) -> float | int:
-    if mode == "none":
-        return round(value, 6)
-    if mode == "round":
-        return int(round(value))
-    if mode == "floor":
-        return int(math.floor(value))
-    if mode == "ceil":
-        return int(math.ceil(value))
-    raise ValueError(f"Unknown rounding mode: {mode}")
+ROUNDERS = {
+    "none": lambda values: np.round(values, 6),
+    "round": lambda values: np.rint(values).astype(np.int64),
+    "floor": lambda values: np.floor(values).astype(np.int64),
+    "ceil": lambda values: np.ceil(values).astype(np.int64),
+}
+
+
+def resolve_rounding(mode: str) -> Callable[[np.ndarray], np.ndarray]:
+    try:
+        return ROUNDERS[mode]
+    except KeyError:
+        raise ValueError(f"Unknown rounding mode: {mode}") from None
 
 
 def scenario_id(rate: float) -> str:
     return f"pr_{str(rate).replace('.', 'p')}"
 
 
-def build_demand_rows(
-    input_rows: list[dict[str, str]],
+def build_demand_frame(
+    population: pd.DataFrame,
     days: list[str],
     meal_types: list[str],
     participation_rates: list[float],
-    rounding: str,
-) -> list[dict[str, str | int | float]]:
-    rows: list[dict[str, str | int | float]] = []
-    for rate in participation_rates:
-        scen = scenario_id(rate)
-        for tract in input_rows:
-            child_pop = int(tract["child_pop_u18"])
-            for day in days:
-                for meal_type in meal_types:
-                    expected = child_pop * rate
-                    rows.append(
-                        {
-                            "scenario_id": scen,
-                            "participation_rate": rate,
-                            "distribution_date": day,
-                            "meal_type": meal_type,
-                            "tract_geoid": tract["tract_geoid"],
-                            "tract_name": tract["tract_name"],
-                            "child_pop_u18": child_pop,
-                            "expected_demand": apply_rounding(expected, rounding),
-                        }
-                    )
-    rows.sort(
-        key=lambda r: (
-            str(r["scenario_id"]),
-            str(r["distribution_date"]),
-            str(r["meal_type"]),
-            str(r["tract_geoid"]),
+    round_fn: Callable[[np.ndarray], np.ndarray],
+) -> pd.DataFrame:
+    # Cross product of (rate, tract, day, meal) as integer index arrays.
+    r_idx, t_idx, d_idx, m_idx = (
+        grid.ravel()
+        for grid in np.meshgrid(
+            np.arange(len(participation_rates)),
+            np.arange(len(population)),
+            np.arange(len(days)),
+            np.arange(len(meal_types)),
+            indexing="ij",
         )
     )
-    return rows
-
-
-def write_csv(rows: list[dict[str, str | int | float]], output_csv: Path) -> None:
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "scenario_id",
-        "participation_rate",
-        "distribution_date",
-        "meal_type",
-        "tract_geoid",
-        "tract_name",
-        "child_pop_u18",
-        "expected_demand",
-    ]
-    with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    rates = np.asarray(participation_rates, dtype=np.float64)
+    scenarios = np.array([scenario_id(rate) for rate in participation_rates], dtype=object)
+    # Tract-invariant inputs are gathered once, not per (rate, day, meal).
+    pops = population["child_pop_u18"].to_numpy(dtype=np.int64)[t_idx]
+
+    demand = pd.DataFrame(
+        {
+            "scenario_id": scenarios[r_idx],
+            "participation_rate": rates[r_idx],
+            "distribution_date": np.asarray(days, dtype=object)[d_idx],
+            "meal_type": np.asarray(meal_types, dtype=object)[m_idx],
+            "tract_geoid": population["tract_geoid"].to_numpy(dtype=object)[t_idx],
+            "tract_name": population["tract_name"].to_numpy(dtype=object)[t_idx],
+            "child_pop_u18": pops,
+            "expected_demand": round_fn(pops * rates[r_idx]),
+        }
+    )
+    return demand.sort_values(
+        ["scenario_id", "distribution_date", "meal_type", "tract_geoid"], kind="stable"
+    ).reset_index(drop=True)
+
+
+def write_csv(demand: pd.DataFrame, output_csv: Path) -> None:
+    write_frame(demand, output_csv)
 
 
 def main() -> None:
@@ -107,7 +102,7 @@ def main() -> None:
         "--output-csv",
         type=Path,
         default=Path("data/processed/tract_day_demand.csv"),
-        help="Output demand CSV.",
+        help="Output demand CSV (a .gz suffix writes gzip).",
     )
     parser.add_argument(
         "--days",
@@ -129,7 +124,7 @@ def main() -> None:
     )
     parser.add_argument(
         "--rounding",
-        choices=["none", "round", "floor", "ceil"],
+        choices=list(ROUNDERS),
         default="none",
         help="Rounding mode for expected_demand.",
     )
@@ -143,22 +138,26 @@ def main() -> None:
     if not meal_types:
         raise ValueError("At least one meal type is required.")
 
-    with args.input_csv.open(newline="", encoding="utf-8") as f:
-        input_rows = list(csv.DictReader(f))
-    if not input_rows:
+    population = pd.read_csv(
+        args.input_csv,
+        usecols=["tract_geoid", "tract_name", "child_pop_u18"],
+        dtype={"tract_geoid": str, "tract_name": str, "child_pop_u18": np.int64},
+        keep_default_na=False,
+    )
+    if population.empty:
         raise ValueError(f"No rows found in {args.input_csv}")
 
-    rows = build_demand_rows(
-        input_rows=input_rows,
+    demand = build_demand_frame(
+        population=population,
         days=days,
         meal_types=meal_types,
         participation_rates=rates,
-        rounding=args.rounding,
+        round_fn=resolve_rounding(args.rounding),
     )
-    write_csv(rows, args.output_csv)
+    write_csv(demand, args.output_csv)
     print(
-        f"Wrote {len(rows)} rows to {args.output_csv} "
-        f"for {len(input_rows)} tracts, {len(days)} day(s), "
+        f"Wrote {len(demand)} rows to {args.output_csv} "
+        f"for {len(population)} tracts, {len(days)} day(s), "
         f"{len(meal_types)} meal type(s), {len(rates)} scenario(s)."
     )
 
@@ -5,44 +5,149 @@ from __future__ import annotations
 
 import argparse
 import csv
-import math
+from itertools import repeat
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
+
+from _csv_io import open_output
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
 
 EARTH_RADIUS_KM = 6371.0088
 KM_TO_MILES = 0.621371192
 
+def half_angle_trig(deg: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """sin and cos of half the angle, for expanding sin((b - a) / 2) per point."""
+    half = np.radians(deg) / 2
+    return np.sin(half), np.cos(half)
+
+
+if HAS_NUMBA:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _haversine_matrix(sin_lat1, cos_lat1, sin_lon1, cos_lon1, sin_lat2, cos_lat2, sin_lon2, cos_lon2, cos_lats1, cos_lats2, out):
+        """Fill out[i, j] with the half-angle haversine term `a` for tract i, site j."""
+        for i in prange(sin_lat1.size):
+            # Tract-side terms are invariant across sites.
+            s_lat_i, c_lat_i = sin_lat1[i], cos_lat1[i]
+            s_lon_i, c_lon_i = sin_lon1[i], cos_lon1[i]
+            cos_lat_i = cos_lats1[i]
+            for j in range(sin_lat2.size):
+                sin_dlat = c_lat_i * sin_lat2[j] - s_lat_i * cos_lat2[j]
+                sin_dlon = c_lon_i * sin_lon2[j] - s_lon_i * cos_lon2[j]
+                out[i, j] = sin_dlat * sin_dlat + cos_lat_i * cos_lats2[j] * sin_dlon * sin_dlon
+
+
+def haversine_km(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """
+    (T, S) great-circle distances in km between T points and S points (degrees).
+    sin(dlat/2) and sin(dlon/2) are expanded as sin(b/2)cos(a/2) - cos(b/2)sin(a/2)
+    from per-point trig, so only sqrt/arcsin run per pair. Uses a Numba kernel
+    over tracts when numba is installed.
+    """
+    sin_lat1, cos_lat1 = half_angle_trig(lat1)
+    sin_lat2, cos_lat2 = half_angle_trig(lat2)
+    sin_lon1, cos_lon1 = half_angle_trig(lon1)
+    sin_lon2, cos_lon2 = half_angle_trig(lon2)
+    # cos(lat) = cos^2(lat/2) - sin^2(lat/2), computed once per tract and per site
+    cos_lats1 = cos_lat1**2 - sin_lat1**2
+    cos_lats2 = cos_lat2**2 - sin_lat2**2
+    if HAS_NUMBA:
+        a = np.empty((sin_lat1.size, sin_lat2.size))
+        _haversine_matrix(
+            sin_lat1, cos_lat1, sin_lon1, cos_lon1, sin_lat2, cos_lat2, sin_lon2, cos_lon2, cos_lats1, cos_lats2, a
+        )
+    else:
+        # Same expression as the kernel, evaluated in place to keep (T, S) temporaries few.
+        a = np.multiply.outer(cos_lat1, sin_lat2)
+        a -= np.multiply.outer(sin_lat1, cos_lat2)
+        np.square(a, out=a)
+        term = np.multiply.outer(cos_lon1, sin_lon2)
+        term -= np.multiply.outer(sin_lon1, cos_lon2)
+        np.square(term, out=term)
+        term *= np.multiply.outer(cos_lats1, cos_lats2)
+        a += term
+        del term
+    np.sqrt(a, out=a)
+    np.arcsin(a, out=a)
+    a *= 2 * EARTH_RADIUS_KM
+    return a
+
+
+def read_tracts(path: Path) -> pd.DataFrame:
+    return pd.read_csv(
+        path,
+        usecols=["tract_geoid", "centroid_lat", "centroid_lon"],
+        dtype={"tract_geoid": str, "centroid_lat": np.float64, "centroid_lon": np.float64},
+        keep_default_na=False,
+    )
+
 
-def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    lat1r = math.radians(lat1)
-    lon1r = math.radians(lon1)
-    lat2r = math.radians(lat2)
-    lon2r = math.radians(lon2)
-    dlat = lat2r - lat1r
-    dlon = lon2r - lon1r
-    a = math.sin(dlat / 2) ** 2 + math.cos(lat1r) * math.cos(lat2r) * math.sin(dlon / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return EARTH_RADIUS_KM * c
+def read_matched_sites(path: Path) -> pd.DataFrame:
+    sites = pd.read_csv(
+        path,
+        usecols=["site_id", "matched", "lat", "lon"],
+        dtype={"site_id": str, "matched": str, "lat": np.float64, "lon": np.float64},
+        keep_default_na=False,
+        na_values={"lat": [""], "lon": [""]},
+    )
+    return sites[sites["matched"].str.lower().isin(["true", "1"])]
 
 
-def read_csv(path: Path) -> list[dict[str, str]]:
-    with path.open(newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+FIELDNAMES = [
+    "tract_geoid",
+    "site_id",
+    "distance_km",
+    "distance_miles",
+    "c_ij",
+]
 
 
-def write_csv(rows: list[dict[str, str | float]], output_csv: Path) -> None:
+def write_csv(
+    output_csv: Path, tract_geoids: list[str], site_ids: list[str], km: np.ndarray, miles: np.ndarray
+) -> None:
+    """Stream the (T, S) matrices tract by tract, so only one row of S pairs is ever materialized."""
     output_csv.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "tract_geoid",
-        "site_id",
-        "distance_km",
-        "distance_miles",
-        "c_ij",
-    ]
-    with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+    km = np.round(km, 6)
+    miles = np.round(miles, 6)
+    with open_output(output_csv) as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
+        for i, tract_geoid in enumerate(tract_geoids):
+            miles_row = miles[i].tolist()
+            writer.writerows(zip(repeat(tract_geoid), site_ids, km[i].tolist(), miles_row, miles_row))
+
+
+def write_parquet(
+    output_parquet: Path, tract_geoids: list[str], site_ids: list[str], km: np.ndarray, miles: np.ndarray
+) -> None:
+    """Columnar copy of the cost matrix: dictionary-encoded ids, same rounded values as the CSV."""
+    output_parquet.parent.mkdir(parents=True, exist_ok=True)
+    miles_flat = pa.array(np.round(miles, 6).ravel())
+    table = pa.table(
+        {
+            "tract_geoid": pa.array(np.repeat(np.asarray(tract_geoids, dtype=object), len(site_ids))).dictionary_encode(),
+            "site_id": pa.array(np.tile(np.asarray(site_ids, dtype=object), len(tract_geoids))).dictionary_encode(),
+            "distance_km": pa.array(np.round(km, 6).ravel()),
+            "distance_miles": miles_flat,
+            "c_ij": miles_flat,
+        }
+    )
+    pq.write_table(table, output_parquet, compression="zstd")
 
 
 def main() -> None:
@@ -63,40 +168,43 @@ def main() -> None:
         "--output-csv",
         type=Path,
         default=Path("data/processed/tract_site_cost_matrix.csv"),
-        help="Output cost matrix CSV.",
+        help="Output cost matrix CSV (a .gz suffix writes gzip).",
+    )
+    parser.add_argument(
+        "--parquet-out",
+        type=Path,
+        default=None,
+        help="Optional Parquet copy of the cost matrix (requires pyarrow).",
     )
     args = parser.parse_args()
+    if args.parquet_out and not HAS_PYARROW:
+        parser.error("--parquet-out requires pyarrow")
 
-    tracts = read_csv(args.tract_centroids_csv)
-    site_rows = read_csv(args.site_locations_csv)
-    sites = [row for row in site_rows if str(row.get("matched", "")).lower() in {"true", "1"}]
-    if not sites:
+    tracts = read_tracts(args.tract_centroids_csv)
+    sites = read_matched_sites(args.site_locations_csv)
+    if sites.empty:
         raise RuntimeError("No matched sites available to build cost matrix.")
-
-    rows: list[dict[str, str | float]] = []
-    for tract in tracts:
-        t_lat = float(tract["centroid_lat"])
-        t_lon = float(tract["centroid_lon"])
-        t_geoid = tract["tract_geoid"]
-        for site in sites:
-            s_lat = float(site["lat"])
-            s_lon = float(site["lon"])
-            km = haversine_km(t_lat, t_lon, s_lat, s_lon)
-            miles = km * KM_TO_MILES
-            rows.append(
-                {
-                    "tract_geoid": t_geoid,
-                    "site_id": site["site_id"],
-                    "distance_km": round(km, 6),
-                    "distance_miles": round(miles, 6),
-                    "c_ij": round(miles, 6),
-                }
-            )
-
-    rows.sort(key=lambda r: (str(r["tract_geoid"]), str(r["site_id"])))
-    write_csv(rows, args.output_csv)
+    # Sorted inputs make the tract-major rows written below come out in
+    # (tract_geoid, site_id) order, so the rows need no final sort.
+    tracts = tracts.sort_values("tract_geoid", kind="stable")
+    sites = sites.sort_values("site_id", kind="stable")
+
+    km = haversine_km(
+        tracts["centroid_lat"].to_numpy(),
+        tracts["centroid_lon"].to_numpy(),
+        sites["lat"].to_numpy(),
+        sites["lon"].to_numpy(),
+    )
+    miles = km * KM_TO_MILES
+
+    tract_geoids = tracts["tract_geoid"].tolist()
+    site_ids = sites["site_id"].tolist()
+    write_csv(args.output_csv, tract_geoids, site_ids, km, miles)
+    if args.parquet_out:
+        write_parquet(args.parquet_out, tract_geoids, site_ids, km, miles)
+        print(f"Wrote Parquet copy to {args.parquet_out}")
     print(
-        f"Wrote {len(rows)} tract-site pairs to {args.output_csv} "
+        f"Wrote {len(tracts) * len(sites)} tract-site pairs to {args.output_csv} "
         f"({len(tracts)} tracts x {len(sites)} matched sites)."
     )
 
@@ -7,6 +7,28 @@ import re
 from pathlib import Path
 
 
+HEADING_TAGS = {"#": "h1", "##": "h2", "###": "h3", "####": "h4", "#####": "h5"}
+IMAGE_RE = re.compile(r'!\[([^\]]*)\]\(([^\)]+)\)')
+TABLE_SEPARATOR_RE = re.compile(r'^[\-\:]+$')
+# Inline rules, applied in order to paragraph text
+INLINE_RULES = [
+    (re.compile(r'\*\*([^*]+)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'\*([^*]+)\*'), r'<em>\1</em>'),
+    (re.compile(r'__([^_]+)__'), r'<strong>\1</strong>'),
+    (re.compile(r'_([^_]+)_'), r'<em>\1</em>'),
+    # Links
+    (re.compile(r'\[([^\]]+)\]\(([^\)]+)\)'), r'<a href="\2">\1</a>'),
+    # Inline code
+    (re.compile(r'`([^`]+)`'), r'<code>\1</code>'),
+]
+
+
+def render_inline(text: str) -> str:
+    for pattern, replacement in INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
 def convert_qmd_to_html(qmd_path: Path, html_path: Path):
     """
     Simple converter from Quarto markdown to HTML.
@@ -47,27 +69,25 @@ def convert_qmd_to_html(qmd_path: Path, html_path: Path):
     in_table = False
     
     for line in lines:
+        # A table runs until the first non-pipe line
+        if in_table and "|" not in line:
+            html_lines.append("</table>")
+            in_table = False
+
         # Skip empty lines after processing
         if not line.strip():
-            if not in_table:
-                html_lines.append("<p></p>")
+            html_lines.append("<p></p>")
             continue
         
         # Headings
-        if line.startswith("##### "):
-            html_lines.append(f"<h5>{line[6:].strip()}</h5>")
-        elif line.startswith("#### "):
-            html_lines.append(f"<h4>{line[5:].strip()}</h4>")
-        elif line.startswith("### "):
-            html_lines.append(f"<h3>{line[4:].strip()}</h3>")
-        elif line.startswith("## "):
-            html_lines.append(f"<h2>{line[3:].strip()}</h2>")
-        elif line.startswith("# "):
-            html_lines.append(f"<h1>{line[2:].strip()}</h1>")
+        head, _, rest = line.partition(" ")
+        if head in HEADING_TAGS:
+            tag = HEADING_TAGS[head]
+            html_lines.append(f"<{tag}>{rest.strip()}</{tag}>")
         
         # Images
         elif line.strip().startswith("!["):
-            match = re.search(r'!\[([^\]]*)\]\(([^\)]+)\)', line)
+            match = IMAGE_RE.search(line)
             if match:
                 alt_text = match.group(1)
                 img_path = match.group(2)
@@ -75,17 +95,18 @@ def convert_qmd_to_html(qmd_path: Path, html_path: Path):
         
         # Tables (pipe-delimited)
         elif "|" in line:
-            in_table = True
+            if not in_table:
+                html_lines.append("<table>")
+                in_table = True
             row = line.split("|")[1:-1]  # Remove leading/trailing empty
             row = [cell.strip() for cell in row]
             
             # Check if separator row (dashes and colons)
-            if all(re.match(r'^[\-\:]+$', cell) for cell in row):
+            if all(TABLE_SEPARATOR_RE.match(cell) for cell in row):
                 continue
             
             if row:
                 tag = "th" if not any("---" in cell for cell in row) else "td"
-                html_lines.append("<table>")
                 html_lines.append("<tr>")
                 for cell in row:
                     # Remove markdown bold/italic
@@ -95,21 +116,12 @@ def convert_qmd_to_html(qmd_path: Path, html_path: Path):
         
         # Bold and italic
         else:
-            text = line.strip()
-            text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
-            text = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', text)
-            text = re.sub(r'__([^_]+)__', r'<strong>\1</strong>', text)
-            text = re.sub(r'_([^_]+)_', r'<em>\1</em>', text)
-            
-            # Links
-            text = re.sub(r'\[([^\]]+)\]\(([^\)]+)\)', r'<a href="\2">\1</a>', text)
-            
-            # Inline code
-            text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
-            
+            text = render_inline(line.strip())
             if text:
                 html_lines.append(f"<p>{text}</p>")
     
+    if in_table:
+        html_lines.append("</table>")
     html_lines.append("</body>")
     html_lines.append("</html>")
     
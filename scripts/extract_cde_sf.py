@@ -6,12 +6,14 @@ from __future__ import annotations
 import pandas as pd
 from pathlib import Path
 
+from _cde import EXCEL_ENGINE, SF_COUNTY_CODE
+
 
 def main():
     p = Path('data/raw/cupc2425-k12.xlsx')
     if not p.exists():
         raise SystemExit(f"Missing {p}; download first")
-    df = pd.read_excel(p, sheet_name='School-Level CALPADS UPC Data', header=1, engine='openpyxl')
+    df = pd.read_excel(p, sheet_name='School-Level CALPADS UPC Data', header=1, engine=EXCEL_ENGINE)
     cols = df.columns.tolist()
     county_col = None
     school_col = None
@@ -29,8 +31,8 @@ def main():
         for c in cols:
             print(' -', repr(str(c)))
         raise SystemExit('Aborting')
-    subset = df[df[county_col].astype(str).str.zfill(2).isin(['075','75'])]
-    out = subset[[school_col, county_col, undup_col]].copy()
+    mask = pd.to_numeric(df[county_col], errors='coerce') == SF_COUNTY_CODE
+    out = df.loc[mask, [school_col, county_col, undup_col]].copy()
     out.columns = ['School Name', 'County Code', 'Unduplicated']
     out_path = Path('data/raw/cupc2425_schoollevel_sf.csv')
     out_path.parent.mkdir(parents=True, exist_ok=True)
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """Extract SF strike meal-site capacities from a PDF export into CSV.
 
-This parser uses `pdftotext -layout` and then scans the normalized text for:
+This parser extracts page text in-process with `pypdfium2` when installed
+(falling back to `pdftotext -layout`) and then scans the normalized text for:
 - site name + address
 - distribution datetime window
 - meal counts (lunches, breakfasts)
@@ -12,11 +13,19 @@ from __future__ import annotations
 import argparse
 import csv
 import re
+import string
 import subprocess
 from collections import defaultdict
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
 
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+
 
 DAY_NAMES = {
     "Monday",
@@ -36,10 +45,30 @@ DATE_LINE_RE = re.compile(
 TOTAL_LINE_RE = re.compile(r"^A total of (.+?) are available\.$", re.IGNORECASE)
 MEAL_COUNT_RE = re.compile(r"(\d+)\s+(lunch(?:es)?|breakfast(?:s)?)", re.IGNORECASE)
 YEAR_HINT_RE = re.compile(r"\b([A-Za-z]+)\s+(\d{1,2}),\s*(20\d{2})\b")
+WHITESPACE_RE = re.compile(r"\s+")
+NOISE_DATE_RE = re.compile(r"^\d{1,2}/\d{1,2}/\d{2},")
+NOISE_PAGE_RE = re.compile(r"^\d+/\d+$")
+NOISE_LINES = {"SF.gov", "English", "Menu"}
+SLUG_CHARS = frozenset(string.ascii_lowercase + string.digits)
+
+FIELDNAMES = [
+    "site_id",
+    "site_name",
+    "address",
+    "distribution_date",
+    "day",
+    "start_time",
+    "end_time",
+    "meal_type",
+    "meals_available",
+    "notes",
+]
+# site_id, distribution_date, start_time, meal_type
+ROW_SORT_KEY = itemgetter(0, 3, 5, 7)
 
 
 def normalize_line(line: str) -> str:
-    return re.sub(r"\s+", " ", line).strip()
+    return WHITESPACE_RE.sub(" ", line).strip()
 
 
 def normalize_time(raw: str) -> str:
@@ -48,22 +77,22 @@ def normalize_time(raw: str) -> str:
 
 
 def slugify(name: str) -> str:
-    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
-    return re.sub(r"-{2,}", "-", slug)
+    # Every character outside [a-z0-9] becomes "-"; splitting on "-" and
+    # dropping empties collapses the runs and trims both ends in one pass.
+    dashed = "".join(ch if ch in SLUG_CHARS else "-" for ch in name.lower())
+    return "-".join(part for part in dashed.split("-") if part)
 
 
 def is_noise(line: str) -> bool:
     if not line:
         return True
-    if line.startswith("https://www.sf.gov/"):
-        return True
-    if re.match(r"^\d{1,2}/\d{1,2}/\d{2},", line):
-        return True
-    if re.match(r"^\d+/\d+$", line):
+    # Branch on the first character so most lines skip both regexes.
+    first = line[0]
+    if first == "h" and line.startswith("https://www.sf.gov/"):
         return True
-    if line in {"SF.gov", "English", "Menu"}:
+    if first.isdigit() and (NOISE_DATE_RE.match(line) or NOISE_PAGE_RE.match(line)):
         return True
-    return False
+    return line in NOISE_LINES
 
 
 def extract_year(text: str) -> int:
@@ -77,18 +106,29 @@ def extract_year(text: str) -> int:
     return datetime.now().year
 
 
-def parse_pdf(input_pdf: Path) -> list[dict[str, str | int]]:
+def extract_pdf_text(input_pdf: Path) -> str:
+    if HAS_PDFIUM:
+        pdf = pdfium.PdfDocument(input_pdf)
+        try:
+            return "\n".join(page.get_textpage().get_text_bounded() for page in pdf)
+        finally:
+            pdf.close()
     result = subprocess.run(
         ["pdftotext", "-layout", str(input_pdf), "-"],
         check=True,
         capture_output=True,
         text=True,
     )
-    raw_text = result.stdout
+    return result.stdout
+
+
+def parse_pdf(input_pdf: Path) -> list[tuple[str | int, ...]]:
+    """Parse meal-site rows as tuples ordered like FIELDNAMES."""
+    raw_text = extract_pdf_text(input_pdf)
     year = extract_year(raw_text)
 
     lines = [normalize_line(line) for line in raw_text.splitlines()]
-    rows: list[dict[str, str | int]] = []
+    rows: list[tuple[str | int, ...]] = []
 
     current_site = ""
     current_address = ""
@@ -161,18 +201,18 @@ def parse_pdf(input_pdf: Path) -> list[dict[str, str | int]]:
             for qty_raw, meal_raw in meal_matches:
                 meal_type = "breakfast" if meal_raw.lower().startswith("breakfast") else "lunch"
                 rows.append(
-                    {
-                        "site_id": site_id_map[current_site],
-                        "site_name": current_site,
-                        "address": current_address,
-                        "distribution_date": current_event["distribution_date"],
-                        "day": current_event["day"],
-                        "start_time": current_event["start_time"],
-                        "end_time": current_event["end_time"],
-                        "meal_type": meal_type,
-                        "meals_available": int(qty_raw),
-                        "notes": notes,
-                    }
+                    (
+                        site_id_map[current_site],
+                        current_site,
+                        current_address,
+                        current_event["distribution_date"],
+                        current_event["day"],
+                        current_event["start_time"],
+                        current_event["end_time"],
+                        meal_type,
+                        int(qty_raw),
+                        notes,
+                    )
                 )
             notes_buffer = []
             note_mode = False
@@ -193,34 +233,15 @@ def parse_pdf(input_pdf: Path) -> list[dict[str, str | int]]:
     if not rows:
         raise ValueError("No rows were parsed from the PDF.")
 
-    rows.sort(
-        key=lambda r: (
-            str(r["site_id"]),
-            str(r["distribution_date"]),
-            str(r["start_time"]),
-            str(r["meal_type"]),
-        )
-    )
+    rows.sort(key=ROW_SORT_KEY)
     return rows
 
 
-def write_csv(rows: list[dict[str, str | int]], output_csv: Path) -> None:
+def write_csv(rows: list[tuple[str | int, ...]], output_csv: Path) -> None:
     output_csv.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "site_id",
-        "site_name",
-        "address",
-        "distribution_date",
-        "day",
-        "start_time",
-        "end_time",
-        "meal_type",
-        "meals_available",
-        "notes",
-    ]
     with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
         writer.writerows(rows)
 
 
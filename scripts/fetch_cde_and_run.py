@@ -11,6 +11,8 @@ import subprocess
 import sys
 from pathlib import Path
 
+from _cde import EXCEL_ENGINE
+
 
 def main():
     parser = argparse.ArgumentParser(description=__doc__)
@@ -29,7 +31,7 @@ def main():
 
     print("Downloading and reading Excel...")
     try:
-        df = pd.read_excel(url, sheet_name=0, engine="openpyxl")
+        df = pd.read_excel(url, sheet_name=0, engine=EXCEL_ENGINE)
     except Exception:
         # try without engine
         df = pd.read_excel(url, sheet_name=0)
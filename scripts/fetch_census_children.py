@@ -10,17 +10,28 @@ from __future__ import annotations
 import argparse
 import csv
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 
 ACS_PATH = "acs/acs5"
 STATE_FIPS = "06"   # California
 COUNTY_FIPS = "075"  # San Francisco County
 API_BASE = "https://api.census.gov/data"
+PROBE_WORKERS = 4
 
 # B01001 bins for ages under 18.
 UNDER18_VARS = {
@@ -35,8 +46,25 @@ UNDER18_VARS = {
 }
 
 
+def _make_session() -> requests.Session:
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        raise_on_status=False,  # hand the last response back for the caller's status check
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=PROBE_WORKERS))
+    return session
+
+
+# One pooled session, so year probes and the tract query reuse TLS connections.
+_SESSION = _make_session()
+
+
 def _api_get(url: str, params: dict[str, str], timeout: int = 30) -> requests.Response:
-    response = requests.get(url, params=params, timeout=timeout)
+    response = _SESSION.get(url, params=params, timeout=timeout)
     return response
 
 
@@ -50,11 +78,18 @@ def detect_latest_acs5_year(
     if api_key:
         probe_params["key"] = api_key
 
-    for year in range(max_year, min_year - 1, -1):
-        url = f"{API_BASE}/{year}/{ACS_PATH}"
-        response = _api_get(url, probe_params, timeout=20)
-        if response.status_code == 200:
-            return year
+    def probe(year: int) -> int:
+        return _api_get(f"{API_BASE}/{year}/{ACS_PATH}", probe_params, timeout=20).status_code
+
+    # Probe newest-first in batches of PROBE_WORKERS concurrent requests; the
+    # first 200 in a batch (in year order) is the latest available year.
+    years = list(range(max_year, min_year - 1, -1))
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+        for start in range(0, len(years), PROBE_WORKERS):
+            batch = years[start : start + PROBE_WORKERS]
+            for year, status in zip(batch, pool.map(probe, batch)):
+                if status == 200:
+                    return year
     raise RuntimeError(
         f"Could not detect an available ACS5 year between {min_year} and {max_year}."
     )
@@ -85,7 +120,7 @@ def fetch_sf_tract_children(*, year: int, api_key: str | None) -> list[dict[str,
             f"Census API request failed ({response.status_code}): {response.text[:300]}"
         )
 
-    payload = response.json()
+    payload = orjson.loads(response.content) if HAS_ORJSON else response.json()
     if not payload or len(payload) < 2:
         raise RuntimeError("Census API returned an empty result set.")
 
@@ -93,12 +128,19 @@ def fetch_sf_tract_children(*, year: int, api_key: str | None) -> list[dict[str,
     data_rows = payload[1:]
     idx = {name: pos for pos, name in enumerate(header)}
 
-    output_rows: list[dict[str, Any]] = []
-    for row in data_rows:
-        male_under18 = sum(to_int(row[idx[var]]) for var in list(UNDER18_VARS.values())[:4])
-        female_under18 = sum(to_int(row[idx[var]]) for var in list(UNDER18_VARS.values())[4:])
-        child_pop_u18 = male_under18 + female_under18
+    # Gather the eight age bins once into a (tracts, 8) array; male bins come first.
+    bin_positions = [idx[var] for var in variable_names]
+    bins = np.array(
+        [[to_int(row[pos]) for pos in bin_positions] for row in data_rows], dtype=np.int64
+    ).reshape(len(data_rows), len(bin_positions))
+    male_totals = bins[:, :4].sum(axis=1)
+    female_totals = bins[:, 4:].sum(axis=1)
+    child_totals = male_totals + female_totals
 
+    output_rows: list[dict[str, Any]] = []
+    for row, male_under18, female_under18, child_pop_u18 in zip(
+        data_rows, male_totals.tolist(), female_totals.tolist(), child_totals.tolist()
+    ):
         state = row[idx["state"]]
         county = row[idx["county"]]
         tract = row[idx["tract"]]
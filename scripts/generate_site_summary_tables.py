@@ -3,40 +3,40 @@
 Generate site-level summary tables for ACS and CDE allocations.
 """
 
-import csv
 from pathlib import Path
-from collections import defaultdict
 
+import pandas as pd
 
-def read_csv(path: Path):
-    """Read CSV and yield rows as dicts."""
-    with open(path, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            yield row
+
+def read_allocations(path: Path) -> pd.DataFrame:
+    """Read the site-day allocation columns used by the summary, already typed."""
+    df = pd.read_csv(
+        path,
+        usecols=["site_id", "site_name", "optimal_meals"],
+        dtype={"site_id": str, "site_name": str, "optimal_meals": float},
+        keep_default_na=False,
+        encoding="utf-8-sig",
+    )
+    df["site_id"] = df["site_id"].str.strip()
+    df["site_name"] = df["site_name"].str.strip()
+    return df
 
 
 def generate_site_summary_table(allocation_csv_path: Path, output_format="markdown"):
     """
     Generate a summary table of optimal allocations by site (aggregated across days/scenarios).
     """
-    site_totals = defaultdict(lambda: {"name": "", "total_optimal": 0.0})
-    
-    for row in read_csv(allocation_csv_path):
-        site_id = row["site_id"].strip()
-        site_name = row["site_name"].strip()
-        optimal_meals = float(row["optimal_meals"])
-        
-        if site_id not in site_totals:
-            site_totals[site_id]["name"] = site_name
-        site_totals[site_id]["total_optimal"] += optimal_meals
-    
-    # Sort by total optimal meals descending
-    sorted_sites = sorted(
-        site_totals.items(),
-        key=lambda x: x[1]["total_optimal"],
-        reverse=True
+    totals = (
+        read_allocations(allocation_csv_path)
+        .groupby("site_id", sort=False)
+        .agg(name=("site_name", "first"), total_optimal=("optimal_meals", "sum"))
+        # Sort by total optimal meals descending (ties keep first-seen order)
+        .sort_values("total_optimal", ascending=False, kind="stable")
     )
+    sorted_sites = [
+        (site_id, {"name": name, "total_optimal": total_optimal})
+        for site_id, name, total_optimal in totals.itertuples()
+    ]
     
     if output_format == "markdown":
         lines = [
@@ -5,89 +5,158 @@ from __future__ import annotations
 
 import argparse
 import csv
+import io
+import json
+import re
+import sqlite3
 import time
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
-GEOCODER_URL = "https://geocoding.geo.census.gov/geocoder/locations/onelineaddress"
+GEOCODER_URL = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
 BENCHMARK = "Public_AR_Current"
+CITY = "San Francisco"
+STATE = "CA"
+# The batch endpoint accepts at most 10,000 addresses per file.
+BATCH_SIZE = 10_000
+# Cached matches are kept indefinitely; a cached no-match (a transient batch
+# failure, or an address fixed upstream) is looked up again after this long.
+NO_MATCH_TTL_S = 7 * 24 * 3600
+FIELDNAMES = [
+    "site_id",
+    "site_name",
+    "address",
+    "full_address_query",
+    "matched",
+    "matched_address",
+    "match_type",
+    "lat",
+    "lon",
+    "tiger_line_id",
+]
+WHITESPACE_RE = re.compile(r"\s+")
+NO_MATCH: dict[str, Any] = {
+    "matched": False,
+    "matched_address": "",
+    "match_type": "",
+    "lat": "",
+    "lon": "",
+    "tiger_line_id": "",
+}
 
 
 def unique_sites(input_csv: Path) -> list[dict[str, str]]:
-    with input_csv.open(newline="", encoding="utf-8") as f:
-        rows = list(csv.DictReader(f))
-
     seen: set[str] = set()
     sites: list[dict[str, str]] = []
-    for row in rows:
-        site_id = row["site_id"]
-        if site_id in seen:
-            continue
-        seen.add(site_id)
-        sites.append(
-            {
-                "site_id": site_id,
-                "site_name": row["site_name"],
-                "address": row["address"],
-            }
-        )
-    sites.sort(key=lambda s: s["site_id"])
+    with open(input_csv, "rb", buffering=1 << 20) as raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        i_site = header.index("site_id")
+        i_name = header.index("site_name")
+        i_address = header.index("address")
+        for row in reader:
+            site_id = row[i_site]
+            if site_id in seen:
+                continue
+            seen.add(site_id)
+            sites.append(
+                {
+                    "site_id": site_id,
+                    "site_name": row[i_name],
+                    "address": row[i_address],
+                }
+            )
+    # Only the output CSV's row order depends on this sort; the batch geocoder
+    # and the cache match results by site_id / address, not by position.
+    sites.sort(key=itemgetter("site_id"))
     return sites
 
 
-def geocode_one(session: requests.Session, full_address: str) -> dict[str, Any]:
-    params = {
-        "address": full_address,
-        "benchmark": BENCHMARK,
-        "format": "json",
-    }
-    response = session.get(GEOCODER_URL, params=params, timeout=30)
+def make_session() -> requests.Session:
+    # The batch lookup is read-only, so a POST that hit a transient 5xx/429
+    # is safe to resend; backoff sleeps 0.2s, 0.4s, 0.8s, ... between tries.
+    retry = Retry(
+        total=5,
+        backoff_factor=0.2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        raise_on_status=False,  # hand the last response back for raise_for_status
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, max_retries=retry))
+    return session
+
+
+def geocode_batch(session: requests.Session, sites: list[dict[str, str]]) -> dict[str, dict[str, Any]]:
+    """Geocode one batch of sites in a single POST, keyed by site_id."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for site in sites:
+        writer.writerow([site["site_id"], site["address"], CITY, STATE, ""])
+    response = session.post(
+        GEOCODER_URL,
+        files={"addressFile": ("addrs.csv", buf.getvalue())},
+        data={"benchmark": BENCHMARK},
+        timeout=300,
+    )
     response.raise_for_status()
-    payload = response.json()
-    matches = payload.get("result", {}).get("addressMatches", [])
-    if not matches:
-        return {
-            "matched": False,
-            "matched_address": "",
-            "match_type": "",
-            "lat": "",
-            "lon": "",
-            "tiger_line_id": "",
+
+    # Response rows: id, input address, match indicator, match type,
+    # matched address, "lon,lat", TIGER/Line id, side. Unmatched rows stop
+    # after the match indicator, and rows come back in arbitrary order.
+    geocodes: dict[str, dict[str, Any]] = {}
+    for row in csv.reader(io.StringIO(response.text)):
+        if not row:
+            continue
+        if len(row) < 7 or row[2] != "Match":
+            geocodes[row[0]] = dict(NO_MATCH)
+            continue
+        lon, _, lat = row[5].partition(",")
+        geocodes[row[0]] = {
+            "matched": True,
+            "matched_address": row[4],
+            "match_type": row[3],
+            "lat": lat,
+            "lon": lon,
+            "tiger_line_id": row[6],
         }
-    best = matches[0]
-    coords = best.get("coordinates", {})
-    tiger = best.get("tigerLine", {})
-    return {
-        "matched": True,
-        "matched_address": best.get("matchedAddress", ""),
-        "match_type": best.get("matchType", ""),
-        "lat": coords.get("y", ""),
-        "lon": coords.get("x", ""),
-        "tiger_line_id": tiger.get("tigerLineId", ""),
-    }
+    return geocodes
+
+
+def norm(address: str) -> str:
+    return WHITESPACE_RE.sub(" ", address.strip().upper())
+
+
+def dump_json(obj: Any) -> str:
+    return orjson.dumps(obj).decode() if HAS_ORJSON else json.dumps(obj)
+
+
+def open_cache(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE IF NOT EXISTS geo(key TEXT PRIMARY KEY, json TEXT, ts INTEGER)")
+    return conn
 
 
 def write_csv(rows: list[dict[str, Any]], output_csv: Path) -> None:
     output_csv.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "site_id",
-        "site_name",
-        "address",
-        "full_address_query",
-        "matched",
-        "matched_address",
-        "match_type",
-        "lat",
-        "lon",
-        "tiger_line_id",
-    ]
+    row_values = itemgetter(*FIELDNAMES)
     with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+        writer = csv.writer(f)
+        writer.writerow(FIELDNAMES)
+        writer.writerows(map(row_values, rows))
 
 
 def main() -> None:
@@ -105,28 +174,61 @@ def main() -> None:
         help="Output geocoded site CSV.",
     )
     parser.add_argument(
-        "--sleep-seconds",
-        type=float,
-        default=0.05,
-        help="Delay between API requests.",
+        "--cache-db",
+        type=Path,
+        default=Path("data/cache/geocode.sqlite"),
+        help="SQLite cache of geocoder results keyed by normalized address (delete the file to clear it).",
+    )
+    parser.add_argument(
+        "--refresh-cache",
+        action="store_true",
+        help="Ignore cached results and geocode every address again, overwriting the cache.",
     )
     args = parser.parse_args()
 
     sites = unique_sites(args.input_csv)
-    results: list[dict[str, Any]] = []
-    with requests.Session() as session:
-        for idx, site in enumerate(sites, start=1):
-            query = f"{site['address']}, San Francisco, CA"
-            geocode = geocode_one(session, query)
-            results.append(
-                {
-                    **site,
-                    "full_address_query": query,
-                    **geocode,
-                }
-            )
-            if idx < len(sites):
-                time.sleep(args.sleep_seconds)
+    keys = {site["site_id"]: norm(f"{site['address']}, {CITY}, {STATE}") for site in sites}
+
+    conn = open_cache(args.cache_db)
+    now = int(time.time())
+    # Only the cache misses (and expired no-matches) hit the API, one site per distinct address.
+    by_key: dict[str, dict[str, Any]] = {}
+    misses: dict[str, dict[str, str]] = {}
+    for site in sites:
+        key = keys[site["site_id"]]
+        if key in by_key or key in misses:
+            continue
+        row = None if args.refresh_cache else conn.execute("SELECT json, ts FROM geo WHERE key=?", (key,)).fetchone()
+        if row is not None:
+            cached = orjson.loads(row[0]) if HAS_ORJSON else json.loads(row[0])
+            if cached["matched"] or now - row[1] < NO_MATCH_TTL_S:
+                by_key[key] = cached
+                continue
+        misses[key] = site
+
+    if misses:
+        geocodes: dict[str, dict[str, Any]] = {}
+        with make_session() as session:
+            site_iter = iter(misses.values())
+            while batch := list(islice(site_iter, BATCH_SIZE)):
+                geocodes.update(geocode_batch(session, batch))
+        for key, site in misses.items():
+            by_key[key] = geocodes.get(site["site_id"], NO_MATCH)
+        conn.executemany(
+            "INSERT OR REPLACE INTO geo VALUES (?, ?, ?)",
+            [(key, dump_json(by_key[key]), now) for key in misses],
+        )
+        conn.commit()
+    conn.close()
+
+    results: list[dict[str, Any]] = [
+        {
+            **site,
+            "full_address_query": f"{site['address']}, {CITY}, {STATE}",
+            **by_key[keys[site["site_id"]]],
+        }
+        for site in sites
+    ]
 
     write_csv(results, args.output_csv)
 
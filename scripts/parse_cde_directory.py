@@ -10,6 +10,16 @@ from pathlib import Path
 
 import pandas as pd
 
+from _cde import EXCEL_ENGINE, SF_COUNTY_CODE
+
+try:
+    import pyarrow  # noqa: F401  (pandas' Parquet engine)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+SHEET = 'School-Level CALPADS UPC Data'
+
 
 def find_col(cols, keywords):
     for k in keywords:
@@ -19,25 +29,39 @@ def find_col(cols, keywords):
     return None
 
 
-def main():
-    p = Path('data/raw/cupc2425-k12.xlsx')
-    if not p.exists():
-        p = Path('data/raw/cupc2425-k12.xlsx')
-    if not p.exists():
-        raise SystemExit('Excel not found at data/raw/cupc2425-k12.xlsx')
-
+def read_sheet(p: Path) -> pd.DataFrame:
     # try a couple header rows to handle messy multi-line headers
-    sheet = 'School-Level CALPADS UPC Data'
     df = None
     for header in (1, 2, 3, 4):
         try:
-            df = pd.read_excel(p, sheet_name=sheet, header=header, engine='openpyxl')
+            df = pd.read_excel(p, sheet_name=SHEET, header=header, engine=EXCEL_ENGINE)
             if df is not None and len(df.columns) > 5:
                 break
         except Exception:
             continue
     if df is None:
         raise SystemExit('Failed to read sheet')
+    # Columns mixing numbers and text (e.g. Charter Number) cannot go to Parquet as-is.
+    mixed = df.columns[df.dtypes == object]
+    return df.astype({c: 'string' for c in mixed})
+
+
+def main():
+    p = Path('data/raw/cupc2425-k12.xlsx')
+    if not p.exists():
+        p = Path('data/raw/cupc2425-k12.xlsx')
+    if not p.exists():
+        raise SystemExit('Excel not found at data/raw/cupc2425-k12.xlsx')
+
+    # Reading this workbook is slow even with calamine, so keep a Parquet copy next to it and
+    # reread that until the workbook changes.
+    parquet_path = p.with_suffix('.parquet')
+    if HAS_PYARROW and parquet_path.exists() and parquet_path.stat().st_mtime >= p.stat().st_mtime:
+        df = pd.read_parquet(parquet_path)
+    else:
+        df = read_sheet(p)
+        if HAS_PYARROW:
+            df.to_parquet(parquet_path, compression='zstd')
 
     cols = list(df.columns)
     school_col = find_col(cols, ['school name', 'school'])
@@ -49,11 +73,14 @@ def main():
         print('Detected columns:', cols)
         raise SystemExit('Could not detect necessary columns automatically')
 
-    out = df[[school_col, county_col, lat_col, lon_col]].copy()
-    out.columns = ['School Name', 'County Code', 'Latitude', 'Longitude']
-    out = out.dropna(subset=['Latitude', 'Longitude'])
-    # filter for SF county code 075 (or 75)
-    out = out[out['County Code'].astype(str).str.zfill(2).isin(['075', '75'])]
+    out = pd.DataFrame({
+        'School Name': df[school_col],
+        'County Code': pd.to_numeric(df[county_col], errors='coerce').astype('Int64'),
+        'Latitude': pd.to_numeric(df[lat_col], errors='coerce').astype('float64'),
+        'Longitude': pd.to_numeric(df[lon_col], errors='coerce').astype('float64'),
+    })
+    in_sf = (out['County Code'] == SF_COUNTY_CODE).fillna(False)
+    out = out[in_sf & out['Latitude'].notna() & out['Longitude'].notna()]
 
     out_path = Path('data/processed/cde_school_locations.csv')
     out_path.parent.mkdir(parents=True, exist_ok=True)
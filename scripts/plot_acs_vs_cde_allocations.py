@@ -3,19 +3,23 @@
 Create scatterplot comparing ACS vs CDE meal assignments.
 """
 
-import csv
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 from pathlib import Path
-from collections import defaultdict
+
+from _csv_io import load
+
+
+KEY_COLUMNS = ["site_id", "distribution_date", "scenario_id"]
 
 
-def read_csv(path: Path):
-    """Read CSV and yield rows as dicts."""
-    with open(path, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            yield row
+def read_csv(path: Path) -> pd.DataFrame:
+    """Read the join keys and optimal meals from an allocation comparison CSV."""
+    return load(path)[KEY_COLUMNS + ["optimal_meals"]].astype({col: str for col in KEY_COLUMNS})
 
 
 def main():
@@ -23,33 +27,17 @@ def main():
     cde_path = Path("data/processed/site_day_allocation_comparison_cde.csv")
     output_path = Path("outputs/figures/acs_vs_cde_allocations_scatter.png")
     
-    # Read both files
-    acs_data = list(read_csv(acs_path))
-    cde_data = list(read_csv(cde_path))
-    
-    # Index by (site_id, distribution_date, scenario_id)
-    acs_index = {}
-    for row in acs_data:
-        key = (row["site_id"], row["distribution_date"], row["scenario_id"])
-        acs_index[key] = float(row["optimal_meals"])
-    
-    cde_index = {}
-    for row in cde_data:
-        key = (row["site_id"], row["distribution_date"], row["scenario_id"])
-        cde_index[key] = float(row["optimal_meals"])
-    
-    # Collect parallel data points
-    acs_meals = []
-    cde_meals = []
-    scenarios = set()
-    
-    for key in acs_index:
-        if key in cde_index:
-            acs_meals.append(acs_index[key])
-            cde_meals.append(cde_index[key])
-            scenarios.add(key[2])  # scenario_id
+    # Inner join on (site_id, distribution_date, scenario_id)
+    merged = read_csv(acs_path).merge(
+        read_csv(cde_path), on=KEY_COLUMNS, suffixes=("_acs", "_cde")
+    )
+    acs_meals = merged["optimal_meals_acs"].to_numpy()
+    cde_meals = merged["optimal_meals_cde"].to_numpy()
+    by_scenario = dict(tuple(merged.groupby("scenario_id", sort=False)))
     
-    scenarios = sorted(scenarios, key=lambda s: float(s.split("_")[1].replace("p", ".")))
+    # Parse each scenario's rate once ("pr_0p2" -> "0.2") for sorting and labels
+    rate_display = {s: s.split("_")[1].replace("p", ".") for s in by_scenario}
+    scenarios = sorted(by_scenario, key=lambda s: float(rate_display[s]))
     
     # Create scatterplot
     fig, ax = plt.subplots(figsize=(10, 8))
@@ -57,19 +45,10 @@ def main():
     colors = {"pr_0p2": "#1f77b4", "pr_0p3": "#ff7f0e", "pr_0p4": "#2ca02c"}
     
     for scenario in scenarios:
-        scenario_acs = []
-        scenario_cde = []
-        for key, acs_val in acs_index.items():
-            if key[2] == scenario and key in cde_index:
-                scenario_acs.append(acs_val)
-                scenario_cde.append(cde_index[key])
-        
-        if scenario_acs:
-            rate_str = scenario.split("_")[1]  # e.g., "0p2"
-            rate_display = rate_str.replace("p", ".")
-            label = f"Participation rate {rate_display}"
-            ax.scatter(scenario_acs, scenario_cde, alpha=0.6, s=60, 
-                      label=label, color=colors.get(scenario, "gray"))
+        grp = by_scenario[scenario]
+        label = f"Participation rate {rate_display[scenario]}"
+        ax.scatter(grp["optimal_meals_acs"], grp["optimal_meals_cde"], alpha=0.6, s=60, 
+                  label=label, color=colors.get(scenario, "gray"), rasterized=True)
     
     # Add diagonal line (perfect agreement)
     max_val = max(max(acs_meals), max(cde_meals))
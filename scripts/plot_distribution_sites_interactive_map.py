@@ -4,95 +4,56 @@ Create an interactive map of SF meal distribution sites using Folium.
 Shows planned vs optimal allocations with popup charts.
 """
 
-import csv
 import json
 from pathlib import Path
-from collections import defaultdict
+from string import Template
 
+from _csv_io import load_map_inputs
 
-def read_csv(path: Path):
-    """Read CSV and yield rows as dicts."""
-    with open(path, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            yield row
 
-
-def load_site_locations(path: Path):
-    """Load site locations."""
-    sites = {}
-    for row in read_csv(path):
-        site_id = row["site_id"].strip()
-        try:
-            lat = float(row.get("lat") or row.get("latitude", 0))
-            lon = float(row.get("lon") or row.get("longitude", 0))
-            name = row["site_name"].strip()
-            if lat and lon:
-                sites[site_id] = {"lat": lat, "lon": lon, "name": name}
-        except (ValueError, KeyError):
-            pass
-    return sites
-
-
-def load_supply(path: Path):
-    """Load supply."""
-    supply = defaultdict(float)
-    for row in read_csv(path):
-        site_id = row["site_id"].strip()
-        try:
-            meals = float(row["meals_available"])
-            supply[site_id] += meals
-        except (ValueError, KeyError):
-            pass
-    return supply
-
-
-def load_allocations(path: Path):
-    """Load allocations."""
-    allocations = defaultdict(float)
-    for row in read_csv(path):
-        site_id = row["site_id"].strip()
-        try:
-            meals = float(row["optimal_meals"])
-            allocations[site_id] += meals
-        except (ValueError, KeyError):
-            pass
-    return allocations
-
-
-def create_bar_chart_html(supply_val, acs_val, cde_val):
-    """Create a simple bar chart HTML for popup."""
-    # Find max for scaling
-    max_val = max(supply_val, acs_val, cde_val, 1)
-    
-    # Scale to 0-100 for display
-    supply_pct = (supply_val / max_val) * 100
-    acs_pct = (acs_val / max_val) * 100
-    cde_pct = (cde_val / max_val) * 100
-    
-    html = f"""
+# Popup markup for one site, compiled once; the bars are scaled to the site's max.
+POPUP_TEMPLATE = Template("""
+<div style="font-family: Arial; font-size: 12px; width: 250px;">
+    <h4 style="margin: 0 0 10px 0; color: #1f77b4;">${name}</h4>
     <div style="width: 220px; font-family: Arial, sans-serif; font-size: 11px;">
         <div style="margin-bottom: 8px;">
-            <strong style="color: #1f77b4;">SFUSD Planned</strong>: {supply_val:.0f} meals
+            <strong style="color: #1f77b4;">SFUSD Planned</strong>: ${supply} meals
             <div style="background-color: #e6f2ff; height: 8px; margin-top: 2px;">
-                <div style="background-color: #1f77b4; height: 100%; width: {supply_pct}%;"></div>
+                <div style="background-color: #1f77b4; height: 100%; width: ${supply_pct}%;"></div>
             </div>
         </div>
         <div style="margin-bottom: 8px;">
-            <strong style="color: #ff7f0e;">ACS Optimal</strong>: {acs_val:.0f} meals
+            <strong style="color: #ff7f0e;">ACS Optimal</strong>: ${acs} meals
             <div style="background-color: #ffe6cc; height: 8px; margin-top: 2px;">
-                <div style="background-color: #ff7f0e; height: 100%; width: {acs_pct}%;"></div>
+                <div style="background-color: #ff7f0e; height: 100%; width: ${acs_pct}%;"></div>
             </div>
         </div>
         <div>
-            <strong style="color: #2ca02c;">CDE Optimal</strong>: {cde_val:.0f} meals
+            <strong style="color: #2ca02c;">CDE Optimal</strong>: ${cde} meals
             <div style="background-color: #e6ffe6; height: 8px; margin-top: 2px;">
-                <div style="background-color: #2ca02c; height: 100%; width: {cde_pct}%;"></div>
+                <div style="background-color: #2ca02c; height: 100%; width: ${cde_pct}%;"></div>
             </div>
         </div>
     </div>
-    """
-    return html
+</div>
+""")
+
+
+def popup_html(name, supply_val, acs_val, cde_val):
+    """Render the popup (site name plus simple bar chart HTML) for one site."""
+    # Find max for scaling
+    max_val = max(supply_val, acs_val, cde_val, 1)
+    
+    # Scale to 0-100 for display
+    return POPUP_TEMPLATE.substitute(
+        name=name,
+        supply=f"{supply_val:.0f}",
+        acs=f"{acs_val:.0f}",
+        cde=f"{cde_val:.0f}",
+        supply_pct=(supply_val / max_val) * 100,
+        acs_pct=(acs_val / max_val) * 100,
+        cde_pct=(cde_val / max_val) * 100,
+    )
 
 
 def main():
@@ -105,10 +66,7 @@ def main():
     
     # Load data
     print("Loading site data...")
-    sites = load_site_locations(Path("data/processed/site_locations.csv"))
-    supply = load_supply(Path("data/processed/site_day_supply.csv"))
-    acs_alloc = load_allocations(Path("data/processed/site_day_allocation_comparison.csv"))
-    cde_alloc = load_allocations(Path("data/processed/site_day_allocation_comparison_cde.csv"))
+    sites, supply, acs_alloc, cde_alloc = load_map_inputs(Path("data/processed"))
     
     print(f"Loaded {len(sites)} sites")
     
@@ -116,7 +74,8 @@ def main():
     sf_center = [37.765, -122.450]
     m = folium.Map(location=sf_center, zoom_start=12, tiles='OpenStreetMap')
     
-    # Add sites with popups
+    # Collect sites as GeoJSON points; one layer renders them all
+    features = []
     for site_id, site_info in sites.items():
         lat = site_info["lat"]
         lon = site_info["lon"]
@@ -140,28 +99,25 @@ def main():
         else:
             color = 'green'
         
-        # Create popup with HTML
-        popup_html = f"""
-        <div style="font-family: Arial; font-size: 12px; width: 250px;">
-            <h4 style="margin: 0 0 10px 0; color: #1f77b4;">{name}</h4>
-            {create_bar_chart_html(supply_meals, acs_meals, cde_meals)}
-        </div>
-        """
-        
-        popup = folium.Popup(popup_html, max_width=300)
-        
-        # Add marker
-        folium.CircleMarker(
-            location=[lat, lon],
-            radius=8,
-            popup=popup,
-            color='white',
-            fill=True,
-            fillColor=color,
-            fillOpacity=0.7,
-            weight=2,
-            tooltip=f"{name}<br>ACS: {acs_meals:.0f} meals"
-        ).add_to(m)
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {
+                "popup": popup_html(name, supply_meals, acs_meals, cde_meals),
+                "tooltip": f"{name}<br>ACS: {acs_meals:.0f} meals",
+                "color": color,
+            },
+        })
+    
+    # Add markers: styled circle per point, popup/tooltip read from properties
+    folium.GeoJson(
+        {"type": "FeatureCollection", "features": features},
+        name="Meal distribution sites",
+        marker=folium.CircleMarker(radius=8, color='white', fill=True, fillOpacity=0.7, weight=2),
+        style_function=lambda feature: {"fillColor": feature["properties"]["color"]},
+        popup=folium.GeoJsonPopup(fields=["popup"], labels=False, max_width=300),
+        tooltip=folium.GeoJsonTooltip(fields=["tooltip"], labels=False),
+    ).add_to(m)
     
     # Add legend
     legend_html = '''
@@ -4,13 +4,16 @@ Create a map of SF meal distribution sites with embedded bar charts
 showing SFUSD planned vs ACS optimal vs CDE optimal allocations.
 """
 
-import csv
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.patches import Rectangle
 import numpy as np
 from pathlib import Path
-from collections import defaultdict
+
+from _csv_io import load_map_inputs
 
 try:
     import contextily as ctx
@@ -19,83 +22,52 @@ except ImportError:
     HAS_CONTEXTILY = False
 
 
-def read_csv(path: Path):
-    """Read CSV and yield rows as dicts."""
-    with open(path, encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            yield row
+BASEMAP_CACHE = Path("data/cache/sf_basemap_z13.npz")
+BASEMAP_ZOOM = 13
 
 
-def load_site_locations(path: Path):
-    """Load site locations: site_id -> (lat, lon, site_name)."""
-    sites = {}
-    for row in read_csv(path):
-        site_id = row["site_id"].strip()
-        try:
-            lat = float(row.get("lat") or row.get("latitude", 0))
-            lon = float(row.get("lon") or row.get("longitude", 0))
-            name = row["site_name"].strip()
-            if lat and lon:
-                sites[site_id] = {"lat": lat, "lon": lon, "name": name}
-        except (ValueError, KeyError):
-            pass
-    return sites
-
-
-def load_supply(path: Path):
-    """Load supply: site_id -> total meals (sum across days)."""
-    supply = defaultdict(float)
-    for row in read_csv(path):
-        site_id = row["site_id"].strip()
-        try:
-            meals = float(row["meals_available"])
-            supply[site_id] += meals
-        except (ValueError, KeyError):
-            pass
-    return supply
-
+def load_basemap(lon_min, lon_max, lat_min, lat_max):
+    """
+    Return (image, extent) for the OSM basemap warped to EPSG:4326.
+    Tiles are only fetched when the cached copy is missing or covers other bounds.
+    """
+    bounds = np.array([lon_min, lon_max, lat_min, lat_max])
+    if BASEMAP_CACHE.exists():
+        cached = np.load(BASEMAP_CACHE)
+        if np.array_equal(cached["bounds"], bounds):
+            return cached["image"], tuple(cached["extent"])
 
-def load_allocations(path: Path):
-    """Load allocations: site_id -> total optimal meals (sum across days/scenarios)."""
-    allocations = defaultdict(float)
-    for row in read_csv(path):
-        site_id = row["site_id"].strip()
-        try:
-            meals = float(row["optimal_meals"])
-            allocations[site_id] += meals
-        except (ValueError, KeyError):
-            pass
-    return allocations
+    image, extent = ctx.bounds2img(lon_min, lat_min, lon_max, lat_max, zoom=BASEMAP_ZOOM,
+                                   source=ctx.providers.OpenStreetMap.Mapnik, ll=True)
+    image, extent = ctx.warp_tiles(image, extent, t_crs='EPSG:4326')
+    BASEMAP_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(BASEMAP_CACHE, image=image, extent=np.array(extent), bounds=bounds)
+    return image, extent
 
 
-def add_small_bar_chart(ax, x, y, values, colors, bar_width=0.002, max_height=0.004):
+def add_small_bar_charts(ax, xs, ys, values, colors, bar_width=0.002, max_height=0.004):
     """
-    Add a small bar chart at position (x, y) on the map.
-    values: list of [supply, acs, cde] meal counts
+    Add a small bar chart at each position (xs[i], ys[i]) on the map.
+    values: (n_sites, 3) array of [supply, acs, cde] meal counts
     colors: list of colors for bars
     bar_width: width of each bar (reduced 80% from original 0.01)
     max_height: maximum height of bar (reduced 80% from original 0.03)
     """
-    # Normalize values to fit on the map
-    if max(values) > 0:
-        normalized = [v / max(values) * max_height for v in values]
-    else:
-        normalized = [0, 0, 0]
+    # Normalize each site's values to fit on the map
+    site_max = values.max(axis=1, keepdims=True)
+    normalized = np.divide(values, site_max, out=np.zeros_like(values), where=site_max > 0) * max_height
     
-    bar_positions = [-bar_width, 0, bar_width]
-    for i, (pos, val, color) in enumerate(zip(bar_positions, normalized, colors)):
-        ax.bar(x + pos, val, width=bar_width * 0.8, bottom=y, color=color, 
-               alpha=0.8, edgecolor='black', linewidth=0.3)
+    # One ax.bar call for every bar; per-site ordering keeps the original overlap order
+    bar_positions = np.array([-bar_width, 0, bar_width])
+    ax.bar((xs[:, None] + bar_positions).ravel(), normalized.ravel(), width=bar_width * 0.8,
+           bottom=np.repeat(ys, len(bar_positions)), color=colors * len(xs),
+           alpha=0.8, edgecolor='black', linewidth=0.3, rasterized=True)
 
 
 def main():
     # Load data
     print("Loading site data...")
-    sites = load_site_locations(Path("data/processed/site_locations.csv"))
-    supply = load_supply(Path("data/processed/site_day_supply.csv"))
-    acs_alloc = load_allocations(Path("data/processed/site_day_allocation_comparison.csv"))
-    cde_alloc = load_allocations(Path("data/processed/site_day_allocation_comparison_cde.csv"))
+    sites, supply, acs_alloc, cde_alloc = load_map_inputs(Path("data/processed"))
     
     print(f"Loaded {len(sites)} sites")
     
@@ -114,9 +86,12 @@ def main():
     # Try to add OpenStreetMap basemap
     if HAS_CONTEXTILY:
         try:
-            # Add OSM basemap (zoom level 13 good for SF)
-            ctx.add_basemap(ax, crs='EPSG:4326', source=ctx.providers.OpenStreetMap.Mapnik, 
-                           zoom=13, alpha=0.6)
+            # Add OSM basemap (zoom level 13 good for SF), cached under data/cache
+            image, extent = load_basemap(lon_min, lon_max, lat_min, lat_max)
+            ax.imshow(image, extent=extent, interpolation='bilinear', alpha=0.6)
+            ax.set_xlim(lon_min, lon_max)
+            ax.set_ylim(lat_min, lat_max)
+            ctx.add_attribution(ax, ctx.providers.OpenStreetMap.Mapnik.get('attribution'))
             print("✅ Added OpenStreetMap basemap")
         except Exception as e:
             print(f"⚠️  Could not add basemap: {e}")
@@ -130,28 +105,21 @@ def main():
     # Plot sites with embedded bar charts
     bar_colors = ['#1f77b4', '#ff7f0e', '#2ca02c']  # Blue (SFUSD), Orange (ACS), Green (CDE)
     
-    for site_id, site_info in sites.items():
-        lat = site_info["lat"]
-        lon = site_info["lon"]
-        name = site_info["name"]
-        
-        # Get values for this site
-        supply_meals = supply.get(site_id, 0)
-        acs_meals = acs_alloc.get(site_id, 0)
-        cde_meals = cde_alloc.get(site_id, 0)
-        
-        values = [supply_meals, acs_meals, cde_meals]
-        
-        # Skip if all zero
-        if max(values) == 0:
-            continue
-        
-        # Add small bar chart at site location (reduced size 80%)
-        add_small_bar_chart(ax, lon, lat, values, bar_colors, 
-                           bar_width=0.002, max_height=0.004)
-        
-        # Add site marker (small circle at center)
-        ax.plot(lon, lat, 'ko', markersize=4, alpha=0.4, zorder=5)
+    plotted = [
+        (site_info["lon"], site_info["lat"],
+         supply.get(site_id, 0), acs_alloc.get(site_id, 0), cde_alloc.get(site_id, 0))
+        for site_id, site_info in sites.items()
+    ]
+    # Skip sites where all three values are zero
+    plotted = np.array([row for row in plotted if max(row[2:]) > 0], dtype=float).reshape(-1, 5)
+    lons, lats, values = plotted[:, 0], plotted[:, 1], plotted[:, 2:]
+    
+    # Add small bar charts at site locations (reduced size 80%)
+    add_small_bar_charts(ax, lons, lats, values, bar_colors, 
+                         bar_width=0.002, max_height=0.004)
+    
+    # Add site markers (small circle at center)
+    ax.plot(lons, lats, 'ko', markersize=4, alpha=0.4, zorder=5)
     
     # Create legend
     from matplotlib.patches import Patch
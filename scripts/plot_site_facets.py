@@ -4,16 +4,26 @@
 from __future__ import annotations
 
 import argparse
-import csv
-from collections import defaultdict
 from pathlib import Path
 
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+import pandas as pd
 
+from _csv_io import load
 
-def read_csv(path: Path) -> list[dict[str, str]]:
-    with path.open(newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+# Styling shared by all 40 facets, applied once instead of per Axes.
+FACET_RC = {
+    "axes.grid": True,
+    "grid.alpha": 0.25,
+    "grid.linewidth": 0.5,
+    "axes.titlesize": 8,
+    "axes.labelsize": 8,
+    "xtick.labelsize": 7,
+    "ytick.labelsize": 7,
+}
 
 
 def main() -> None:
@@ -38,77 +48,71 @@ def main() -> None:
     )
     args = parser.parse_args()
 
-    comp_rows = read_csv(args.comparison_csv)
-    site_rows = read_csv(args.site_locations_csv)
+    comp = load(args.comparison_csv)
+    site_rows = load(args.site_locations_csv)
 
     site_meta = {
-        row["site_id"]: {
-            "site_name": row["site_name"],
-            "address": row["address"],
-        }
-        for row in site_rows
+        row.site_id: {"site_name": row.site_name, "address": row.address}
+        for row in site_rows.itertuples(index=False)
     }
 
-    # Aggregate each site's total two-day meals by scenario.
-    # key: (site_id, participation_rate) -> [status_sum, optimal_sum]
-    agg: dict[tuple[str, float], list[float]] = defaultdict(lambda: [0.0, 0.0])
-    for row in comp_rows:
-        site_id = row["site_id"]
-        rate = float(row["participation_rate"])
-        agg[(site_id, rate)][0] += float(row["status_quo_meals"])
-        agg[(site_id, rate)][1] += float(row["optimal_meals"])
+    # Aggregate each site's total two-day meals by scenario: one row per
+    # (site_id, participation_rate) with status quo and optimal sums.
+    agg = comp.groupby(["site_id", "participation_rate"], sort=True)[
+        ["status_quo_meals", "optimal_meals"]
+    ].sum()
 
     site_ids = sorted(site_meta.keys())
-    rates = sorted({float(row["participation_rate"]) for row in comp_rows})
+    rates = sorted(comp["participation_rate"].unique().tolist())
 
-    nrows, ncols = 8, 5
-    fig, axes = plt.subplots(nrows=nrows, ncols=ncols, figsize=(22, 30), sharex=True, sharey=True)
-    axes_flat = axes.flatten()
-
-    y_max = 0.0
-    for site_id in site_ids:
-        for rate in rates:
-            status, optimal = agg[(site_id, rate)]
-            y_max = max(y_max, status, optimal)
-    y_max = y_max * 1.08 if y_max > 0 else 1.0
+    # Sites or rates missing from the comparison plot as zero.
+    full_index = pd.MultiIndex.from_product([site_ids, rates], names=agg.index.names)
+    agg = agg.reindex(full_index, fill_value=0.0)
+    status_by_site = agg["status_quo_meals"].to_numpy().reshape(len(site_ids), len(rates))
+    optimal_by_site = agg["optimal_meals"].to_numpy().reshape(len(site_ids), len(rates))
 
-    for idx, site_id in enumerate(site_ids):
-        ax = axes_flat[idx]
-        ys_status = [agg[(site_id, rate)][0] for rate in rates]
-        ys_opt = [agg[(site_id, rate)][1] for rate in rates]
-
-        ax.plot(rates, ys_status, marker="o", linewidth=1.2, markersize=3.8, label="Status Quo")
-        ax.plot(rates, ys_opt, marker="s", linewidth=1.2, markersize=3.8, label="Optimal")
-        ax.set_ylim(0, y_max)
-        ax.grid(alpha=0.25, linewidth=0.5)
-
-        meta = site_meta[site_id]
-        ax.set_title(f"{meta['site_name']}\n{meta['address']}", fontsize=8)
-
-    for idx in range(len(site_ids), len(axes_flat)):
-        axes_flat[idx].axis("off")
-
-    for ax in axes_flat:
-        ax.set_xlabel("Participation Rate", fontsize=8)
-        ax.set_ylabel("Two-Day Meals", fontsize=8)
-        ax.tick_params(axis="both", labelsize=7)
-
-    handles, labels = axes_flat[0].get_legend_handles_labels()
-    fig.legend(
-        handles,
-        labels,
-        loc="lower center",
-        bbox_to_anchor=(0.5, 0.006),
-        ncol=2,
-        frameon=False,
-        fontsize=11,
-    )
-    fig.suptitle("Status Quo vs Optimal Reallocation by Site (8 x 5 facets)", fontsize=16, y=0.995)
-    fig.tight_layout(rect=(0, 0.03, 1, 0.982))
+    y_max = float(agg.to_numpy().max()) if len(agg) else 0.0
+    y_max = y_max * 1.08 if y_max > 0 else 1.0
 
-    args.output_png.parent.mkdir(parents=True, exist_ok=True)
-    fig.savefig(args.output_png, dpi=300)
-    plt.close(fig)
+    nrows, ncols = 8, 5
+    with plt.rc_context(FACET_RC):
+        fig, axes = plt.subplots(nrows=nrows, ncols=ncols, figsize=(22, 30), sharex=True, sharey=True)
+        axes_flat = axes.flatten()
+
+        for idx, site_id in enumerate(site_ids):
+            ax = axes_flat[idx]
+            ys_status = status_by_site[idx]
+            ys_opt = optimal_by_site[idx]
+
+            ax.plot(rates, ys_status, marker="o", linewidth=1.2, markersize=3.8, label="Status Quo", rasterized=True)
+            ax.plot(rates, ys_opt, marker="s", linewidth=1.2, markersize=3.8, label="Optimal", rasterized=True)
+
+            meta = site_meta[site_id]
+            ax.set_title(f"{meta['site_name']}\n{meta['address']}")
+
+        for idx in range(len(site_ids), len(axes_flat)):
+            axes_flat[idx].axis("off")
+
+        # Axes are shared, so one set_ylim covers every facet; labels go on in one setp.
+        axes_flat[0].set_ylim(0, y_max)
+        plt.setp(axes_flat, xlabel="Participation Rate", ylabel="Two-Day Meals")
+
+        handles, labels = axes_flat[0].get_legend_handles_labels()
+        fig.legend(
+            handles,
+            labels,
+            loc="lower center",
+            bbox_to_anchor=(0.5, 0.006),
+            ncol=2,
+            frameon=False,
+            fontsize=11,
+        )
+        fig.suptitle("Status Quo vs Optimal Reallocation by Site (8 x 5 facets)", fontsize=16, y=0.995)
+        fig.tight_layout(rect=(0, 0.03, 1, 0.982))
+
+        args.output_png.parent.mkdir(parents=True, exist_ok=True)
+        fig.savefig(args.output_png, dpi=300)
+        plt.close(fig)
     print(f"Wrote facet plot to {args.output_png}")
 
 
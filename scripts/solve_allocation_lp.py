@@ -4,153 +4,441 @@
 from __future__ import annotations
 
 import argparse
-import csv
-from collections import defaultdict
+import gzip
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Any
 
+import matplotlib
+
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
+from scipy import sparse
 from scipy.optimize import linprog
 
-
-def read_csv(path: Path) -> list[dict[str, str]]:
-    with path.open(newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+from _csv_io import write_frame
+
+try:
+    import highspy
+    HAS_HIGHSPY = True
+except ImportError:
+    HAS_HIGHSPY = False
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Cold solves with at least this many columns use interior point instead of
+# dual simplex. Daily LPs here (~5k-16k columns, batched or not) solve 2-3x
+# faster with simplex, so IPM only kicks in for much larger instances.
+IPM_MIN_COLS = 200_000
+
+SUMMARY_COLUMNS = [
+    "scenario_id",
+    "participation_rate",
+    "meal_type",
+    "model_status_quo_served",
+    "model_optimal_served",
+    "total_demand",
+    "total_supply",
+    "status_quo_unmet",
+    "optimal_unmet",
+    "status_quo_coverage_rate",
+    "optimal_coverage_rate",
+    "status_quo_avg_distance_miles",
+    "optimal_avg_distance_miles",
+    "total_l1_reallocation",
+    "implied_meals_moved",
+    "unmet_penalty",
+    "reallocation_cap_multiplier",
+]
+# Per-site columns each scenario-day contributes; site_name and delta_meals are added in main().
+SITE_BLOCK_COLUMNS = [
+    "scenario_id",
+    "participation_rate",
+    "distribution_date",
+    "site_id",
+    "status_quo_meals",
+    "optimal_meals",
+]
+
+
+def open_input(path: Path):
+    """Binary handle for reading `path`; a .gz suffix is read through gzip."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    return open(path, "rb", buffering=1 << 20)
+
+
+def read_table(path: Path, string_columns: list[str], float_columns: list[str]) -> pd.DataFrame:
+    """Read only the named columns of `path`, typed as str / float64 (ids keep leading zeros)."""
+    with open_input(path) as f:
+        if HAS_PYARROW:
+            column_types = {col: pa.string() for col in string_columns}
+            column_types.update({col: pa.float64() for col in float_columns})
+            table = pv.read_csv(
+                f,
+                convert_options=pv.ConvertOptions(
+                    column_types=column_types,
+                    include_columns=string_columns + float_columns,
+                ),
+            )
+            return table.to_pandas()
+        dtype = {col: str for col in string_columns}
+        dtype.update({col: "float64" for col in float_columns})
+        return pd.read_csv(
+            f,
+            encoding="utf-8",
+            usecols=string_columns + float_columns,
+            dtype=dtype,
+            keep_default_na=False,
+            float_precision="round_trip",
+        )
 
 
-def write_csv(rows: list[dict[str, Any]], output_csv: Path, fieldnames: list[str]) -> None:
-    output_csv.parent.mkdir(parents=True, exist_ok=True)
-    with output_csv.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+def site_totals(n_i: int, n_j: int) -> sparse.csr_matrix:
+    """(n_j, n_i * n_j) 0/1 matrix whose row j sums x_ij over tracts i (x flattened row-major)."""
+    return sparse.kron(np.ones((1, n_i)), sparse.eye(n_j), format="csr")
+
+
+def tract_totals(n_i: int, n_j: int) -> sparse.csr_matrix:
+    """(n_i, n_i * n_j) 0/1 matrix whose row i sums x_ij over sites j (x flattened row-major)."""
+    return sparse.kron(sparse.eye(n_i), np.ones((1, n_j)), format="csr")
+
+
+def solve_lp(
+    c: np.ndarray,
+    a_ub: sparse.csr_matrix,
+    b_ub: np.ndarray,
+    a_eq: sparse.csr_matrix,
+    b_eq: np.ndarray,
+    label: str,
+    highs: highspy.Highs | None = None,
+) -> tuple[np.ndarray, float, highspy.Highs | None]:
+    """Minimise c @ z s.t. a_ub @ z <= b_ub, a_eq @ z == b_eq, z >= 0.
+
+    Returns (z, objective, model). With highspy installed, passing the returned
+    model back for an LP of the same shape and sparsity only updates its costs
+    and row bounds, so HiGHS re-solves from the previous optimal basis. Cold
+    solves of IPM_MIN_COLS columns or more use interior point.
+    """
+    if not HAS_HIGHSPY:
+        if not len(b_eq):
+            a_eq = b_eq = None
+        method = "highs-ipm" if len(c) >= IPM_MIN_COLS else "highs-ds"
+        # One (lb, ub) pair broadcasts to every variable.
+        res = linprog(c, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=b_eq, bounds=(0, None), method=method)
+        if not res.success:
+            raise RuntimeError(f"{label} LP failed: {res.message}")
+        return res.x, float(res.fun), None
+
+    n_col = len(c)
+    n_row = len(b_ub) + len(b_eq)
+    row_lower = np.concatenate([np.full(len(b_ub), -np.inf), b_eq])
+    row_upper = np.concatenate([b_ub, b_eq])
+    if highs is None:
+        a = sparse.vstack([a_ub, a_eq], format="csc")
+        lp = highspy.HighsLp()
+        lp.num_col_ = n_col
+        lp.num_row_ = n_row
+        lp.col_cost_ = c
+        lp.col_lower_ = np.zeros(n_col)
+        lp.col_upper_ = np.full(n_col, np.inf)
+        lp.row_lower_ = row_lower
+        lp.row_upper_ = row_upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+        lp.a_matrix_.num_col_ = n_col
+        lp.a_matrix_.num_row_ = n_row
+        lp.a_matrix_.start_ = a.indptr
+        lp.a_matrix_.index_ = a.indices
+        lp.a_matrix_.value_ = a.data
+        highs = highspy.Highs()
+        highs.setOptionValue("output_flag", False)
+        highs.passModel(lp)
+        if n_col >= IPM_MIN_COLS:
+            highs.setOptionValue("solver", "ipm")
+    else:
+        # Warm re-solves start from the stored basis, which only simplex uses.
+        highs.setOptionValue("solver", "simplex")
+        highs.changeColsCost(n_col, np.arange(n_col, dtype=np.int32), c)
+        highs.changeRowsBounds(n_row, np.arange(n_row, dtype=np.int32), row_lower, row_upper)
+
+    highs.run()
+    status = highs.getModelStatus()
+    if status != highspy.HighsModelStatus.kOptimal:
+        raise RuntimeError(f"{label} LP failed: {highs.modelStatusToString(status)}")
+    z = np.asarray(highs.getSolution().col_value)
+    return z, float(highs.getInfo().objective_function_value), highs
+
+
+def solve_blocks(
+    blocks: list[tuple[np.ndarray, sparse.csr_matrix, np.ndarray, sparse.csr_matrix, np.ndarray]],
+    label: str,
+    highs: highspy.Highs | None = None,
+) -> tuple[list[np.ndarray], highspy.Highs | None]:
+    """Solve independent (c, a_ub, b_ub, a_eq, b_eq) LPs as one block-diagonal LP.
+
+    Returns each block's slice of the solution, plus the model for warm starts.
+    """
+    if len(blocks) == 1:
+        z, _, highs = solve_lp(*blocks[0], label, highs)
+        return [z], highs
+    c, a_ub, b_ub, a_eq, b_eq = zip(*blocks)
+    z, _, highs = solve_lp(
+        np.concatenate(c),
+        sparse.block_diag(a_ub, format="csr"),
+        np.concatenate(b_ub),
+        sparse.block_diag(a_eq, format="csr"),
+        np.concatenate(b_eq),
+        label,
+        highs,
+    )
+    offsets = np.cumsum([len(block_c) for block_c in c])[:-1]
+    return np.split(z, offsets), highs
 
 
-def solve_status_quo(
+def allocation_lp(
     costs: np.ndarray,
     demand: np.ndarray,
-    supply: np.ndarray,
+    site_cap: np.ndarray,
+    total_supply: float,
     unmet_penalty: float,
-) -> dict[str, Any]:
+) -> tuple[np.ndarray, sparse.csr_matrix, np.ndarray, sparse.csr_matrix, np.ndarray]:
+    """Transportation LP over x shared by both allocation problems.
+
+    The unmet slack u_i = demand_i - sum_j x_ij is substituted out: minimise
+    sum (c_ij - penalty) x_ij (+ penalty * total demand) over x alone. The
+    status quo and the reallocation differ only in `site_cap`, i.e. in row
+    bounds, so one HiGHS model per day serves both and is re-solved hot.
+    """
     n_i, n_j = costs.shape
     n_x = n_i * n_j
-    n_u = n_i
-    n_vars = n_x + n_u
-
-    c = np.zeros(n_vars)
-    c[:n_x] = costs.reshape(-1)
-    c[n_x:] = unmet_penalty
-
-    # Site capacity: sum_i x_ij <= supply_j
-    a_ub = np.zeros((n_j, n_vars))
-    b_ub = supply.copy()
-    for j in range(n_j):
-        for i in range(n_i):
-            a_ub[j, i * n_j + j] = 1.0
-
-    # Demand balance: sum_j x_ij + u_i = demand_i
-    a_eq = np.zeros((n_i, n_vars))
-    b_eq = demand.copy()
-    for i in range(n_i):
-        row = i
-        for j in range(n_j):
-            a_eq[row, i * n_j + j] = 1.0
-        a_eq[row, n_x + i] = 1.0
-
-    bounds = [(0, None)] * n_vars
-    res = linprog(c, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=b_eq, bounds=bounds, method="highs")
-    if not res.success:
-        raise RuntimeError(f"Status quo LP failed: {res.message}")
-
-    z = res.x
-    x = z[:n_x].reshape((n_i, n_j))
-    u = z[n_x:]
-    return {
-        "x": x,
-        "u": u,
-        "y": supply.copy(),  # fixed
-        "objective": float(res.fun),
-    }
+    c = costs.reshape(-1) - unmet_penalty
+
+    # 1) Site capacity: sum_i x_ij <= site_cap_j
+    # 2) Tract demand: sum_j x_ij <= demand_i
+    # 3) Daily total supply: sum_ij x_ij <= total_supply (redundant for the status quo)
+    a_ub = sparse.vstack(
+        [site_totals(n_i, n_j), tract_totals(n_i, n_j), np.ones((1, n_x))],
+        format="csr",
+    )
+    b_ub = np.concatenate([site_cap, demand, [total_supply]])
+    a_eq = sparse.csr_matrix((0, n_x))
+    b_eq = np.zeros(0)
+    return c, a_ub, b_ub, a_eq, b_eq
 
 
-def solve_optimal_reallocation(
+def status_quo_lp(
+    costs: np.ndarray,
+    demand: np.ndarray,
+    supply: np.ndarray,
+    unmet_penalty: float,
+) -> tuple[np.ndarray, sparse.csr_matrix, np.ndarray, sparse.csr_matrix, np.ndarray]:
+    # y fixed at supply: each site ships at most its own meals.
+    return allocation_lp(costs, demand, supply, float(np.sum(supply)), unmet_penalty)
+
+
+def solve_status_quo(
+    days: list[tuple[np.ndarray, np.ndarray, np.ndarray]],
+    unmet_penalty: float,
+    highs: highspy.Highs | None = None,
+) -> tuple[list[dict[str, Any]], highspy.Highs | None]:
+    """Solve the status-quo LP for each (costs, demand, supply) day, in one HiGHS call."""
+    blocks = [status_quo_lp(costs, demand, supply, unmet_penalty) for costs, demand, supply in days]
+    zs, highs = solve_blocks(blocks, "Status quo", highs)
+
+    results = []
+    for (costs, demand, supply), (c, *_), z in zip(days, blocks, zs):
+        x = z.reshape(costs.shape)
+        u = np.maximum(demand - x.sum(axis=1), 0.0)
+        results.append(
+            {
+                "x": x,
+                "u": u,
+                "y": supply.copy(),  # fixed
+                "objective": float(c @ z) + unmet_penalty * float(np.sum(demand)),
+            }
+        )
+    return results, highs
+
+
+def optimal_reallocation_lp(
     costs: np.ndarray,
     demand: np.ndarray,
     status_supply: np.ndarray,
     unmet_penalty: float,
     reallocation_cap_multiplier: float,
-) -> dict[str, Any]:
+) -> tuple[np.ndarray, sparse.csr_matrix, np.ndarray, sparse.csr_matrix, np.ndarray]:
+    # y_j only bounds sum_i x_ij from above, so it is projected out: site loads
+    # are capped at cap_multiplier * status_supply_j, and conservation caps
+    # total served. y is rebuilt from the loads afterwards (spread_supply).
+    return allocation_lp(
+        costs,
+        demand,
+        reallocation_cap_multiplier * status_supply,
+        float(np.sum(status_supply)),
+        unmet_penalty,
+    )
+
+
+def spread_supply(loads: np.ndarray, status_supply: np.ndarray, reallocation_cap_multiplier: float) -> np.ndarray:
+    """Site meals y for the given site loads, moving as few meals as possible from the status quo.
+
+    Each site keeps its status-quo meals clipped to [load, cap * status_supply].
+    The daily total is then restored by taking the excess from sites holding
+    more than their load (or adding a shortfall to sites below their cap), in
+    proportion to that spare room. Any such split moves the minimum
+    sum_j |y_j - status_supply_j|.
+    """
+    cap = reallocation_cap_multiplier * status_supply
+    y = np.clip(status_supply, loads, cap)
+    excess = float(np.sum(y)) - float(np.sum(status_supply))
+    room = y - loads if excess > 0 else cap - y
+    if room.sum() < abs(excess) and not np.isclose(room.sum(), abs(excess)):
+        raise RuntimeError("Optimal-reallocation LP failed: site caps cannot hold the day's total supply")
+    if excess and room.sum() > 0:
+        y -= excess * room / room.sum()
+        np.clip(y, loads, cap, out=y)  # drop float round-off below the load
+    return y
+
+
+def nearest_site_reallocation(
+    costs: np.ndarray,
+    demand: np.ndarray,
+    status_supply: np.ndarray,
+    unmet_penalty: float,
+    reallocation_cap_multiplier: float,
+) -> dict[str, Any] | None:
+    """Closed-form reallocation optimum, or None when the shortcut does not apply.
+
+    If every tract can be fully served from its nearest site without exceeding
+    any site cap, that assignment is optimal (each unit is served at its
+    minimum cost and serving beats the penalty).
+    """
+    if unmet_penalty <= costs.max():
+        return None
+    total_supply = float(np.sum(status_supply))
+    slack = total_supply - float(np.sum(demand))
+    if slack < 0:
+        return None
     n_i, n_j = costs.shape
-    n_x = n_i * n_j
-    n_u = n_i
-    n_y = n_j
-    n_vars = n_x + n_u + n_y
-
-    c = np.zeros(n_vars)
-    c[:n_x] = costs.reshape(-1)
-    c[n_x : n_x + n_u] = unmet_penalty
-
-    # 1) Link x to y: sum_i x_ij - y_j <= 0
-    # 2) y upper bound: y_j <= cap_multiplier * status_supply_j
-    a_ub = np.zeros((2 * n_j, n_vars))
-    b_ub = np.zeros(2 * n_j)
-    for j in range(n_j):
-        # link
-        for i in range(n_i):
-            a_ub[j, i * n_j + j] = 1.0
-        a_ub[j, n_x + n_u + j] = -1.0
-        b_ub[j] = 0.0
-
-        # upper bound
-        a_ub[n_j + j, n_x + n_u + j] = 1.0
-        b_ub[n_j + j] = reallocation_cap_multiplier * status_supply[j]
-
-    # 1) Demand balance: sum_j x_ij + u_i = demand_i
-    # 2) Daily total supply conservation: sum_j y_j = sum_j status_supply_j
-    a_eq = np.zeros((n_i + 1, n_vars))
-    b_eq = np.zeros(n_i + 1)
-    for i in range(n_i):
-        for j in range(n_j):
-            a_eq[i, i * n_j + j] = 1.0
-        a_eq[i, n_x + i] = 1.0
-        b_eq[i] = demand[i]
-    a_eq[n_i, n_x + n_u : n_x + n_u + n_j] = 1.0
-    b_eq[n_i] = float(np.sum(status_supply))
-
-    bounds = [(0, None)] * n_vars
-    res = linprog(c, A_ub=a_ub, b_ub=b_ub, A_eq=a_eq, b_eq=b_eq, bounds=bounds, method="highs")
-    if not res.success:
-        raise RuntimeError(f"Optimal-reallocation LP failed: {res.message}")
-
-    z = res.x
-    x = z[:n_x].reshape((n_i, n_j))
-    u = z[n_x : n_x + n_u]
-    y = z[n_x + n_u :]
+    nearest = costs.argmin(axis=1)
+    loads = np.bincount(nearest, weights=demand, minlength=n_j)
+    headroom = reallocation_cap_multiplier * status_supply - loads
+    if np.any(headroom < 0) or headroom.sum() < slack:
+        return None
+
+    x = np.zeros((n_i, n_j))
+    x[np.arange(n_i), nearest] = demand
     return {
         "x": x,
-        "u": u,
-        "y": y,
-        "objective": float(res.fun),
+        "u": np.zeros(n_i),
+        "y": spread_supply(loads, status_supply, reallocation_cap_multiplier),
+        "objective": float(np.einsum("ij,ij->", costs, x)),
     }
 
 
-def build_cost_lookup(cost_rows: list[dict[str, str]]) -> dict[tuple[str, str], float]:
-    lookup: dict[tuple[str, str], float] = {}
-    for row in cost_rows:
-        lookup[(row["tract_geoid"], row["site_id"])] = float(row["c_ij"])
-    return lookup
+def solve_optimal_reallocation(
+    days: list[tuple[np.ndarray, np.ndarray, np.ndarray]],
+    unmet_penalty: float,
+    reallocation_cap_multiplier: float,
+    highs: highspy.Highs | None = None,
+) -> tuple[list[dict[str, Any]], highspy.Highs | None]:
+    """Solve the reallocation LP for each (costs, demand, status_supply) day, in one HiGHS call."""
+    # Skip HiGHS only when every day in the batch has a closed form, so a
+    # cached model always sees the same block structure.
+    shortcuts = [
+        nearest_site_reallocation(costs, demand, status_supply, unmet_penalty, reallocation_cap_multiplier)
+        for costs, demand, status_supply in days
+    ]
+    if all(result is not None for result in shortcuts):
+        return shortcuts, highs
+
+    blocks = [
+        optimal_reallocation_lp(costs, demand, status_supply, unmet_penalty, reallocation_cap_multiplier)
+        for costs, demand, status_supply in days
+    ]
+    zs, highs = solve_blocks(blocks, "Optimal-reallocation", highs)
+
+    results = []
+    for (costs, demand, status_supply), (c, *_), z in zip(days, blocks, zs):
+        x = z.reshape(costs.shape)
+        results.append(
+            {
+                "x": x,
+                "u": np.maximum(demand - x.sum(axis=1), 0.0),
+                "y": spread_supply(x.sum(axis=0), status_supply, reallocation_cap_multiplier),
+                "objective": float(c @ z) + unmet_penalty * float(np.sum(demand)),
+            }
+        )
+    return results, highs
+
+
+def build_cost_matrix(cost_df: pd.DataFrame) -> tuple[np.ndarray, dict[str, int], dict[str, int]]:
+    """Pivot c_ij rows into a dense (tract x site) array plus tract/site id -> index codes.
+
+    The array is float32 (distances in miles need no more); day_costs() widens
+    each day's block to float64 for HiGHS.
+    """
+    pivot = cost_df.pivot(index="tract_geoid", columns="site_id", values="c_ij")
+    tract_codes = {tract: i for i, tract in enumerate(pivot.index)}
+    site_codes = {site: j for j, site in enumerate(pivot.columns)}
+    return pivot.to_numpy(dtype=np.float32), tract_codes, site_codes
+
+
+if HAS_NUMBA:
+
+    @njit(cache=True)
+    def _gather_costs(c_arr, tract_idx, site_idx):
+        """costs[i, j] = c_arr[tract_idx[i], site_idx[j]], widened to float64."""
+        out = np.empty((tract_idx.size, site_idx.size))
+        for i in range(tract_idx.size):
+            row = c_arr[tract_idx[i]]
+            for j in range(site_idx.size):
+                out[i, j] = row[site_idx[j]]
+        return out
+
+
+def day_costs(
+    c_arr: np.ndarray,
+    tract_codes: dict[str, int],
+    site_codes: dict[str, int],
+    tracts: list[str],
+    sites: tuple[str, ...],
+) -> np.ndarray:
+    tract_idx = np.array([tract_codes.get(tract, -1) for tract in tracts], dtype=np.int64)
+    site_idx = np.array([site_codes.get(site, -1) for site in sites], dtype=np.int64)
+    for ids, idx, kind in ((tracts, tract_idx, "tract"), (sites, site_idx, "site")):
+        if np.any(idx < 0):
+            raise KeyError(f"Missing c_ij rows for {kind}={ids[int(np.argmin(idx))]}")
+    if HAS_NUMBA:
+        costs = _gather_costs(c_arr, tract_idx, site_idx)
+    else:
+        costs = c_arr[np.ix_(tract_idx, site_idx)].astype(np.float64)
+    missing = np.argwhere(np.isnan(costs))
+    if len(missing):
+        i, j = missing[0]
+        raise KeyError(f"Missing c_ij for tract={tracts[i]}, site={sites[j]}")
+    return costs
 
 
 def plot_site_day_comparison(
-    site_rows: list[dict[str, Any]],
+    site_comp: pd.DataFrame,
     out_png: Path,
 ) -> None:
-    by_scenario: dict[str, list[dict[str, Any]]] = defaultdict(list)
-    rate_by_scenario: dict[str, float] = {}
-    for row in site_rows:
-        by_scenario[row["scenario_id"]].append(row)
-        rate_by_scenario[row["scenario_id"]] = float(row["participation_rate"])
+    by_scenario = dict(tuple(site_comp.groupby("scenario_id", sort=False)))
+    rate_by_scenario = {scenario: float(rows["participation_rate"].iloc[-1]) for scenario, rows in by_scenario.items()}
 
     scenarios = sorted(by_scenario.keys(), key=lambda s: rate_by_scenario[s])
     n = len(scenarios)
@@ -160,10 +448,10 @@ def plot_site_day_comparison(
 
     for ax, scenario in zip(axes, scenarios):
         rows = by_scenario[scenario]
-        xs = [float(r["status_quo_meals"]) for r in rows]
-        ys = [float(r["optimal_meals"]) for r in rows]
-        max_val = max(xs + ys) if rows else 1.0
-        ax.scatter(xs, ys, alpha=0.8, s=32)
+        xs = rows["status_quo_meals"].to_numpy()
+        ys = rows["optimal_meals"].to_numpy()
+        max_val = float(max(xs.max(), ys.max())) if len(rows) else 1.0
+        ax.scatter(xs, ys, alpha=0.8, s=32, rasterized=True)
         ax.plot([0, max_val], [0, max_val], linestyle="--", linewidth=1.2)
         ax.set_title(f"{scenario} (rate={rate_by_scenario[scenario]:.2f})")
         ax.set_xlabel("Status Quo Meals (site-day)")
@@ -176,25 +464,156 @@ def plot_site_day_comparison(
     plt.close(fig)
 
 
+# Inputs shared by every scenario solve, set once per process by init_state().
+_STATE: dict[str, Any] = {}
+
+
+def init_state(state: dict[str, Any]) -> None:
+    _STATE.clear()
+    _STATE.update(state)
+    # Each day's LPs keep the same shape across scenarios (only demand moves),
+    # so the HiGHS models are kept per batch of (day, tracts, sites) and
+    # warm-started across the scenarios this process solves.
+    highs_models: dict[tuple[tuple[str, tuple[str, ...], tuple[str, ...]], ...], highspy.Highs | None] = {}
+    _STATE["highs_models"] = highs_models
+    # Costs depend only on the day and its tracts, not on the scenario.
+    cost_cache: dict[tuple[str, tuple[str, ...]], np.ndarray] = {}
+    _STATE["cost_cache"] = cost_cache
+
+
+def solve_scenario(scenario_id: str) -> tuple[dict[str, Any], list[dict[str, np.ndarray]]]:
+    """Solve every day of one scenario: (summary row, per-day site column blocks)."""
+    args = _STATE["args"]
+    supply_by_day = _STATE["supply_by_day"]
+    days = _STATE["days"]
+    demand_by_key = _STATE["demand_by_key"]
+    c_arr, tract_codes, site_codes = _STATE["c_arr"], _STATE["tract_codes"], _STATE["site_codes"]
+    highs_models = _STATE["highs_models"]
+    cost_cache = _STATE["cost_cache"]
+    model_keys: dict[str, tuple[str, tuple[str, ...], tuple[str, ...]]] = {}
+    rate = _STATE["scenario_rates"][scenario_id]
+    site_blocks: list[dict[str, np.ndarray]] = []
+
+    totals = {
+        "demand": 0.0,
+        "supply": 0.0,
+        "served_status": 0.0,
+        "served_optimal": 0.0,
+        "unmet_status": 0.0,
+        "unmet_optimal": 0.0,
+        "dist_status": 0.0,
+        "dist_optimal": 0.0,
+        "l1_shift": 0.0,
+    }
+
+    day_inputs: list[tuple[str, tuple[str, ...], np.ndarray, np.ndarray, np.ndarray]] = []
+    for day in days:
+        sites, status_supply_vec = supply_by_day[day]
+        demand_key = (scenario_id, day)
+        if demand_key not in demand_by_key:
+            continue
+        tracts, demand_vec = demand_by_key[demand_key]
+
+        tract_key = tuple(tracts)
+        costs = cost_cache.get((day, tract_key))
+        if costs is None:
+            costs = cost_cache[(day, tract_key)] = day_costs(c_arr, tract_codes, site_codes, tracts, sites)
+        model_keys[day] = (day, tract_key, sites)
+
+        day_inputs.append((day, sites, costs, demand_vec, status_supply_vec))
+
+    for start in range(0, len(day_inputs), args.batch_days):
+        batch = day_inputs[start : start + args.batch_days]
+        problems = [(costs, demand_vec, supply_vec) for _, _, costs, demand_vec, supply_vec in batch]
+        model_key = tuple(model_keys[day] for day, *_ in batch)
+        statuses, highs = solve_status_quo(problems, args.unmet_penalty, highs_models.get(model_key))
+        # Same model, only the site-cap row bounds move: re-solved from the status-quo basis.
+        optima, highs_models[model_key] = solve_optimal_reallocation(
+            problems,
+            args.unmet_penalty,
+            args.reallocation_cap_multiplier,
+            highs,
+        )
+
+        for (day, sites, costs, demand_vec, status_supply_vec), status, optimal in zip(batch, statuses, optima):
+            served_status = float(np.sum(status["x"]))
+            served_optimal = float(np.sum(optimal["x"]))
+            unmet_status = float(np.sum(status["u"]))
+            unmet_optimal = float(np.sum(optimal["u"]))
+            dist_status = float(np.einsum("ij,ij->", costs, status["x"]))
+            dist_optimal = float(np.einsum("ij,ij->", costs, optimal["x"]))
+
+            totals["demand"] += float(np.sum(demand_vec))
+            totals["supply"] += float(np.sum(status_supply_vec))
+            totals["served_status"] += served_status
+            totals["served_optimal"] += served_optimal
+            totals["unmet_status"] += unmet_status
+            totals["unmet_optimal"] += unmet_optimal
+            totals["dist_status"] += dist_status
+            totals["dist_optimal"] += dist_optimal
+            totals["l1_shift"] += float(np.sum(np.abs(optimal["y"] - status_supply_vec)))
+
+            n_j = len(sites)
+            site_blocks.append(
+                {
+                    "scenario_id": np.full(n_j, scenario_id, dtype=object),
+                    "participation_rate": np.full(n_j, rate),
+                    "distribution_date": np.full(n_j, day, dtype=object),
+                    "site_id": np.asarray(sites, dtype=object),
+                    "status_quo_meals": status_supply_vec,
+                    "optimal_meals": optimal["y"],
+                }
+            )
+
+    served_status = totals["served_status"]
+    served_optimal = totals["served_optimal"]
+    demand_total = totals["demand"]
+
+    summary_row = {
+        "scenario_id": scenario_id,
+        "participation_rate": rate,
+        "meal_type": args.meal_type,
+        "model_status_quo_served": round(served_status, 6),
+        "model_optimal_served": round(served_optimal, 6),
+        "total_demand": round(demand_total, 6),
+        "total_supply": round(totals["supply"], 6),
+        "status_quo_unmet": round(totals["unmet_status"], 6),
+        "optimal_unmet": round(totals["unmet_optimal"], 6),
+        "status_quo_coverage_rate": round(served_status / demand_total, 6) if demand_total else 0.0,
+        "optimal_coverage_rate": round(served_optimal / demand_total, 6) if demand_total else 0.0,
+        "status_quo_avg_distance_miles": round(totals["dist_status"] / served_status, 6)
+        if served_status
+        else 0.0,
+        "optimal_avg_distance_miles": round(totals["dist_optimal"] / served_optimal, 6)
+        if served_optimal
+        else 0.0,
+        "total_l1_reallocation": round(totals["l1_shift"], 6),
+        "implied_meals_moved": round(0.5 * totals["l1_shift"], 6),
+        "unmet_penalty": args.unmet_penalty,
+        "reallocation_cap_multiplier": args.reallocation_cap_multiplier,
+    }
+    return summary_row, site_blocks
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
         "--supply-csv",
         type=Path,
         default=Path("data/processed/site_day_supply.csv"),
-        help="Site/day supply CSV.",
+        help="Site/day supply CSV (.csv or .csv.gz).",
     )
     parser.add_argument(
         "--demand-csv",
         type=Path,
         default=Path("data/processed/tract_day_demand.csv"),
-        help="Tract/day demand CSV with scenarios.",
+        help="Tract/day demand CSV with scenarios (.csv or .csv.gz).",
     )
     parser.add_argument(
         "--cost-csv",
         type=Path,
         default=Path("data/processed/tract_site_cost_matrix.csv"),
-        help="Tract-site c_ij matrix CSV.",
+        help="Tract-site c_ij matrix CSV (.csv or .csv.gz).",
     )
     parser.add_argument(
         "--meal-type",
@@ -218,13 +637,13 @@ def main() -> None:
         "--summary-out",
         type=Path,
         default=Path("data/processed/allocation_comparison_summary.csv"),
-        help="Scenario summary output CSV.",
+        help="Scenario summary output CSV (a .gz suffix writes gzip).",
     )
     parser.add_argument(
         "--site-comparison-out",
         type=Path,
         default=Path("data/processed/site_day_allocation_comparison.csv"),
-        help="Site-day comparison output CSV.",
+        help="Site-day comparison output CSV (a .gz suffix writes gzip).",
     )
     parser.add_argument(
         "--figure-out",
@@ -232,198 +651,108 @@ def main() -> None:
         default=Path("outputs/figures/status_quo_vs_optimal_allocations.png"),
         help="Output figure path.",
     )
+    parser.add_argument(
+        "--batch-days",
+        type=int,
+        default=1,
+        help="Solve this many days of a scenario as one block-diagonal LP (more days use more memory).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Solve scenarios in this many processes (1 solves them in order in-process).",
+    )
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.batch_days < 1:
+        parser.error("--batch-days must be at least 1")
+
+    supply_df = read_table(
+        args.supply_csv,
+        ["site_id", "site_name", "distribution_date", "meal_type"],
+        ["meals_available"],
+    )
+    supply_df = supply_df[supply_df["meal_type"].str.strip().str.lower() == args.meal_type.lower()]
+    demand_df = read_table(
+        args.demand_csv,
+        ["scenario_id", "distribution_date", "meal_type", "tract_geoid"],
+        ["participation_rate", "expected_demand"],
+    )
+    demand_df = demand_df[demand_df["meal_type"].str.strip().str.lower() == args.meal_type.lower()]
+    c_arr, tract_codes, site_codes = build_cost_matrix(
+        read_table(args.cost_csv, ["tract_geoid", "site_id"], ["c_ij"])
+    )
 
-    supply_rows = [
-        row
-        for row in read_csv(args.supply_csv)
-        if row["meal_type"].strip().lower() == args.meal_type.lower()
-    ]
-    demand_rows = [
-        row
-        for row in read_csv(args.demand_csv)
-        if row["meal_type"].strip().lower() == args.meal_type.lower()
-    ]
-    cost_rows = read_csv(args.cost_csv)
-    cost_lookup = build_cost_lookup(cost_rows)
-
-    if not supply_rows:
+    if supply_df.empty:
         raise ValueError(f"No supply rows for meal_type={args.meal_type}")
-    if not demand_rows:
+    if demand_df.empty:
         raise ValueError(f"No demand rows for meal_type={args.meal_type}")
 
-    site_name_lookup = {row["site_id"]: row["site_name"] for row in supply_rows}
-
-    supply_by_day: dict[str, dict[str, float]] = defaultdict(dict)
-    for row in supply_rows:
-        day = row["distribution_date"]
-        supply_by_day[day][row["site_id"]] = float(row["meals_available"])
-
-    demand_by_key: dict[tuple[str, str], list[dict[str, str]]] = defaultdict(list)
-    for row in demand_rows:
-        key = (row["scenario_id"], row["distribution_date"])
-        demand_by_key[key].append(row)
-
-    scenario_rates: dict[str, float] = {}
-    for row in demand_rows:
-        scenario_rates[row["scenario_id"]] = float(row["participation_rate"])
-
-    summary_rows: list[dict[str, Any]] = []
-    site_comp_rows: list[dict[str, Any]] = []
-
-    for scenario_id in sorted(scenario_rates, key=lambda s: scenario_rates[s]):
-        rate = scenario_rates[scenario_id]
-
-        totals = {
-            "demand": 0.0,
-            "supply": 0.0,
-            "served_status": 0.0,
-            "served_optimal": 0.0,
-            "unmet_status": 0.0,
-            "unmet_optimal": 0.0,
-            "dist_status": 0.0,
-            "dist_optimal": 0.0,
-            "l1_shift": 0.0,
-        }
+    site_name_lookup = dict(zip(supply_df["site_id"], supply_df["site_name"]))
 
-        for day in sorted(supply_by_day.keys()):
-            day_supply_map = supply_by_day[day]
-            sites = sorted(day_supply_map.keys())
-            demand_key = (scenario_id, day)
-            day_demand_rows = demand_by_key.get(demand_key, [])
-            if not day_demand_rows:
-                continue
-            tracts = sorted(row["tract_geoid"] for row in day_demand_rows)
-            demand_lookup = {row["tract_geoid"]: float(row["expected_demand"]) for row in day_demand_rows}
-
-            n_i = len(tracts)
-            n_j = len(sites)
-            costs = np.zeros((n_i, n_j))
-            for i, tract in enumerate(tracts):
-                for j, site in enumerate(sites):
-                    key = (tract, site)
-                    if key not in cost_lookup:
-                        raise KeyError(f"Missing c_ij for tract={tract}, site={site}")
-                    costs[i, j] = cost_lookup[key]
-
-            demand_vec = np.array([demand_lookup[tract] for tract in tracts], dtype=float)
-            status_supply_vec = np.array([day_supply_map[site] for site in sites], dtype=float)
-
-            status = solve_status_quo(
-                costs=costs,
-                demand=demand_vec,
-                supply=status_supply_vec,
-                unmet_penalty=args.unmet_penalty,
-            )
-            optimal = solve_optimal_reallocation(
-                costs=costs,
-                demand=demand_vec,
-                status_supply=status_supply_vec,
-                unmet_penalty=args.unmet_penalty,
-                reallocation_cap_multiplier=args.reallocation_cap_multiplier,
-            )
-
-            served_status = float(np.sum(status["x"]))
-            served_optimal = float(np.sum(optimal["x"]))
-            unmet_status = float(np.sum(status["u"]))
-            unmet_optimal = float(np.sum(optimal["u"]))
-            dist_status = float(np.sum(costs * status["x"]))
-            dist_optimal = float(np.sum(costs * optimal["x"]))
-
-            totals["demand"] += float(np.sum(demand_vec))
-            totals["supply"] += float(np.sum(status_supply_vec))
-            totals["served_status"] += served_status
-            totals["served_optimal"] += served_optimal
-            totals["unmet_status"] += unmet_status
-            totals["unmet_optimal"] += unmet_optimal
-            totals["dist_status"] += dist_status
-            totals["dist_optimal"] += dist_optimal
-            totals["l1_shift"] += float(np.sum(np.abs(optimal["y"] - status_supply_vec)))
+    # day -> (sorted site ids, meals_available aligned to them)
+    supply_by_day: dict[str, tuple[tuple[str, ...], np.ndarray]] = {
+        day: (tuple(group["site_id"]), group["meals_available"].to_numpy(dtype=float))
+        for day, group in supply_df.drop_duplicates(["distribution_date", "site_id"], keep="last")
+        .sort_values("site_id")
+        .groupby("distribution_date", sort=False)
+    }
 
-            for j, site_id in enumerate(sites):
-                status_meals = float(status_supply_vec[j])
-                optimal_meals = float(optimal["y"][j])
-                site_comp_rows.append(
-                    {
-                        "scenario_id": scenario_id,
-                        "participation_rate": rate,
-                        "distribution_date": day,
-                        "site_id": site_id,
-                        "site_name": site_name_lookup.get(site_id, ""),
-                        "status_quo_meals": round(status_meals, 6),
-                        "optimal_meals": round(optimal_meals, 6),
-                        "delta_meals": round(optimal_meals - status_meals, 6),
-                    }
-                )
-
-        served_status = totals["served_status"]
-        served_optimal = totals["served_optimal"]
-        demand_total = totals["demand"]
-
-        summary_rows.append(
-            {
-                "scenario_id": scenario_id,
-                "participation_rate": rate,
-                "meal_type": args.meal_type,
-                "model_status_quo_served": round(served_status, 6),
-                "model_optimal_served": round(served_optimal, 6),
-                "total_demand": round(demand_total, 6),
-                "total_supply": round(totals["supply"], 6),
-                "status_quo_unmet": round(totals["unmet_status"], 6),
-                "optimal_unmet": round(totals["unmet_optimal"], 6),
-                "status_quo_coverage_rate": round(served_status / demand_total, 6) if demand_total else 0.0,
-                "optimal_coverage_rate": round(served_optimal / demand_total, 6) if demand_total else 0.0,
-                "status_quo_avg_distance_miles": round(totals["dist_status"] / served_status, 6)
-                if served_status
-                else 0.0,
-                "optimal_avg_distance_miles": round(totals["dist_optimal"] / served_optimal, 6)
-                if served_optimal
-                else 0.0,
-                "total_l1_reallocation": round(totals["l1_shift"], 6),
-                "implied_meals_moved": round(0.5 * totals["l1_shift"], 6),
-                "unmet_penalty": args.unmet_penalty,
-                "reallocation_cap_multiplier": args.reallocation_cap_multiplier,
-            }
-        )
+    # (scenario_id, distribution_date) -> (sorted tract ids, expected_demand aligned to them)
+    demand_by_key: dict[tuple[str, str], tuple[list[str], np.ndarray]] = {
+        key: (group["tract_geoid"].tolist(), group["expected_demand"].to_numpy(dtype=float))
+        for key, group in demand_df.drop_duplicates(["scenario_id", "distribution_date", "tract_geoid"], keep="last")
+        .sort_values("tract_geoid")
+        .groupby(["scenario_id", "distribution_date"], sort=False)
+    }
 
-    write_csv(
-        summary_rows,
-        args.summary_out,
-        [
-            "scenario_id",
-            "participation_rate",
-            "meal_type",
-            "model_status_quo_served",
-            "model_optimal_served",
-            "total_demand",
-            "total_supply",
-            "status_quo_unmet",
-            "optimal_unmet",
-            "status_quo_coverage_rate",
-            "optimal_coverage_rate",
-            "status_quo_avg_distance_miles",
-            "optimal_avg_distance_miles",
-            "total_l1_reallocation",
-            "implied_meals_moved",
-            "unmet_penalty",
-            "reallocation_cap_multiplier",
-        ],
+    scenario_rates: dict[str, float] = dict(
+        zip(demand_df["scenario_id"], demand_df["participation_rate"].tolist())
     )
-    write_csv(
-        site_comp_rows,
-        args.site_comparison_out,
-        [
-            "scenario_id",
-            "participation_rate",
-            "distribution_date",
-            "site_id",
-            "site_name",
-            "status_quo_meals",
-            "optimal_meals",
-            "delta_meals",
-        ],
+
+    state = {
+        "args": args,
+        "supply_by_day": supply_by_day,
+        "demand_by_key": demand_by_key,
+        "c_arr": c_arr,
+        "tract_codes": tract_codes,
+        "site_codes": site_codes,
+        "scenario_rates": scenario_rates,
+        "days": tuple(sorted(supply_by_day)),
+    }
+    scenarios = sorted(scenario_rates, key=lambda s: scenario_rates[s])
+    if args.workers > 1:
+        # Models are not picklable, so each worker warm-starts from the
+        # scenarios it solves; contiguous chunks keep those neighbours together.
+        chunksize = -(-len(scenarios) // args.workers)
+        with ProcessPoolExecutor(args.workers, initializer=init_state, initargs=(state,)) as pool:
+            results = list(pool.map(solve_scenario, scenarios, chunksize=chunksize))
+    else:
+        init_state(state)
+        results = [solve_scenario(scenario_id) for scenario_id in scenarios]
+    summary_rows = [summary_row for summary_row, _ in results]
+    # One dict of per-site column arrays per scenario-day, concatenated below.
+    site_comp_blocks = [block for _, site_blocks in results for block in site_blocks]
+
+    # Explicit columns keep the header when there are no scenarios or no shared days.
+    write_frame(pd.DataFrame(summary_rows, columns=SUMMARY_COLUMNS), args.summary_out)
+
+    site_comp = pd.DataFrame(
+        {
+            col: np.concatenate([block[col] for block in site_comp_blocks]) if site_comp_blocks else np.empty(0)
+            for col in SITE_BLOCK_COLUMNS
+        }
     )
-    plot_site_day_comparison(site_comp_rows, args.figure_out)
+    site_comp.insert(4, "site_name", site_comp["site_id"].map(site_name_lookup).fillna(""))
+    status_meals = site_comp["status_quo_meals"].to_numpy()
+    optimal_meals = site_comp["optimal_meals"].to_numpy()
+    site_comp["status_quo_meals"] = status_meals.round(6)
+    site_comp["optimal_meals"] = optimal_meals.round(6)
+    site_comp["delta_meals"] = (optimal_meals - status_meals).round(6)
+    write_frame(site_comp, args.site_comparison_out)
+    plot_site_day_comparison(site_comp, args.figure_out)
 
     print(f"Wrote summary: {args.summary_out}")
     print(f"Wrote site-day comparison: {args.site_comparison_out}")